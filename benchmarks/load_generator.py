@@ -0,0 +1,399 @@
+"""
+Generator obciążenia i pomiar end-to-end pary NetworkServer / NetworkClient.
+
+Otwiera --connections połączeń NetworkClient (każde z jednym czujnikiem z sensors.py),
+każde wysyła --rate odczytów na sekundę przez --duration sekund, i raportuje:
+odczyty/s, opóźnienie ACK (p50/p95/p99/p999), CPU i RSS procesu serwera (z /proc, także
+procesów roboczych trybu multiprocess). Wynik jest zapisywany jako JSON (--output), żeby
+porównywać ścieżkę odbioru między commitami.
+
+Opóźnienie to czas wywołania send()/send_batch(): przy --window 0 (domyślnie) jest to pełny
+czas do otrzymania ACK; przy --window > 0 wysyłka jest potokowa i mierzony jest tylko czas
+wywołania ("latency_kind": "send_call").
+
+Uruchomienie z katalogu projektu:
+  python -m benchmarks.load_generator --connections 1000 --rate 5 --duration 30 --server-mode asyncio
+  python -m benchmarks.load_generator --server-mode none --port 9999 --server-pid 1234  # zewnętrzny serwer
+"""
+import argparse
+import contextlib
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from network.client import NetworkClient
+from sensors import TemperatureSensor, HumiditySensor, PressureSensor, LightSensor
+from server.async_server import _raise_open_files_limit
+
+SENSOR_CLASSES = (TemperatureSensor, HumiditySensor, PressureSensor, LightSensor)
+PERCENTILES = (("p50", 50.0), ("p95", 95.0), ("p99", 99.0), ("p999", 99.9))
+
+
+# --- Serwer testowy ---
+
+def _run_server(mode, port, workers):
+    """Proces serwera testowego; komunikaty o połączeniach są wyciszane (tysiące linii)."""
+    # Na poziomie deskryptora - dziedziczą go też procesy robocze trybu multiprocess.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    if mode == "multiprocess":
+        from server.multiproc import MultiProcessNetworkServer
+        server = MultiProcessNetworkServer(port, verbose=False, workers=workers)
+    elif mode == "asyncio":
+        from server.async_server import AsyncNetworkServer
+        server = AsyncNetworkServer(port, verbose=False)
+    else:
+        from server.server import NetworkServer
+        server = NetworkServer(port, verbose=False)
+    # terminate() z procesu głównego = zwykłe stop(), żeby tryb multiprocess zamknął procesy robocze.
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    server.start()
+
+
+def wait_for_port(host, port, timeout):
+    """Czeka, aż serwer zacznie przyjmować połączenia."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1.0).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+class ProcessMonitor:
+    """Próbkuje CPU (utime+stime) i RSS procesu i jego potomków z /proc (tylko Linux)."""
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0
+        self.last_rss = 0
+        self._cpu_start = None
+        self._cpu_end = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._clock_ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    @property
+    def available(self):
+        return self.pid is not None and os.path.exists(f"/proc/{self.pid}/stat")
+
+    def start(self):
+        if not self.available:
+            return
+        self._cpu_start = self._cpu_seconds()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._cpu_end = self._cpu_seconds()
+
+    @property
+    def sampled(self):
+        return self._cpu_start is not None
+
+    def cpu_seconds(self):
+        if self._cpu_start is None or self._cpu_end is None:
+            return None
+        return self._cpu_end - self._cpu_start
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.last_rss = self._rss_bytes()
+            self.peak_rss = max(self.peak_rss, self.last_rss)
+
+    def _pids(self):
+        """Proces i wszyscy jego potomkowie (procesy robocze trybu multiprocess)."""
+        parents = {}
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                stat = self._read_stat(int(entry))
+                if stat:
+                    parents.setdefault(int(stat[1]), []).append(int(entry))
+        pids, todo = [], [self.pid]
+        while todo:
+            pid = todo.pop()
+            pids.append(pid)
+            todo.extend(parents.get(pid, []))
+        return pids
+
+    @staticmethod
+    def _read_stat(pid):
+        """Pola /proc/<pid>/stat po nazwie procesu (ta może zawierać spacje): [stan, ppid, ...]."""
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return data[data.rindex(')') + 2:].split()
+
+    def _cpu_seconds(self):
+        total = 0
+        for pid in self._pids():
+            stat = self._read_stat(pid)
+            if stat:
+                total += int(stat[11]) + int(stat[12])  # utime, stime
+        return total / self._clock_ticks
+
+    def _rss_bytes(self):
+        total = 0
+        for pid in self._pids():
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total += int(line.split()[1]) * 1024
+                            break
+            except OSError:
+                pass
+        return total
+
+
+# --- Klienci ---
+
+class Connection:
+    def __init__(self, index, args):
+        sensor_class = SENSOR_CLASSES[index % len(SENSOR_CLASSES)]
+        self.sensor = sensor_class(f"load{index:05d}")
+        self.client = NetworkClient(args.host, args.port, timeout=args.timeout, retries=args.retries,
+                                    window_size=args.window, protocol=args.protocol)
+        self.batch = args.batch
+
+    def next_readings(self):
+        readings = []
+        for _ in range(self.batch):
+            value = self.sensor.read_value()
+            readings.append({"timestamp": datetime.now().isoformat(), "sensor_id": self.sensor.sensor_id,
+                             "value": value, "unit": self.sensor.unit})
+        return readings
+
+    def send(self):
+        readings = self.next_readings()
+        if self.batch > 1:
+            return self.client.send_batch(readings)
+        return self.client.send(readings[0])
+
+
+class Driver(threading.Thread):
+    """
+    Wątek obsługujący część połączeń: każde połączenie ma własny harmonogram (--rate),
+    wątek wysyła do tego, którego termin przypada najwcześniej.
+    """
+    def __init__(self, connections, interval):
+        super().__init__(daemon=True)
+        self.connections = connections
+        self.interval = interval
+        self.start_time = None
+        self.end_time = None
+        self.latencies = []
+        self.sent_readings = 0
+        self.failed = 0
+        self.late = 0
+
+    def run(self):
+        perf_counter = time.perf_counter
+        interval = self.interval
+        # Losowe przesunięcie startu - połączenia nie wysyłają wszystkie w tej samej chwili.
+        schedule = [(self.start_time + random.uniform(0, interval), i) for i in range(len(self.connections))]
+        heapq.heapify(schedule)
+        while schedule:
+            due, i = schedule[0]
+            if due >= self.end_time:
+                break
+            now = perf_counter()
+            if due > now:
+                time.sleep(due - now)
+
+            connection = self.connections[i]
+            started = perf_counter()
+            ok = connection.send()
+            finished = perf_counter()
+            if ok:
+                self.latencies.append(finished - started)
+                self.sent_readings += connection.batch
+            else:
+                self.failed += 1
+
+            next_due = due + interval
+            if next_due < finished:
+                self.late += 1  # nie nadążamy - bez nadrabiania serią
+                next_due = finished
+            heapq.heapreplace(schedule, (next_due, i))
+
+        for connection in self.connections:
+            connection.client.flush()
+
+
+def connect_all(connections, threads):
+    """Łączy klientów równolegle; zwraca listę połączonych."""
+    connected = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        for connection in chunk:
+            try:
+                connection.client.connect()
+            except Exception as e:
+                print(f"[LOADGEN] {e}", file=sys.stderr)
+                continue
+            with lock:
+                connected.append(connection)
+
+    workers = [threading.Thread(target=worker, args=(connections[i::threads],), daemon=True) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return connected
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    _raise_open_files_limit()
+
+    server_process = None
+    server_pid = args.server_pid
+    if args.server_mode != "none":
+        # Nie daemon - serwer w trybie multiprocess sam uruchamia procesy robocze.
+        server_process = multiprocessing.get_context("spawn").Process(
+            target=_run_server, args=(args.server_mode, args.port, args.workers))
+        server_process.start()
+        server_pid = server_process.pid
+        if not wait_for_port(args.host, args.port, 15.0):
+            server_process.terminate()
+            raise SystemExit(f"[LOADGEN] Server did not start listening on port {args.port}.")
+
+    monitor = ProcessMonitor(server_pid)
+    connections = [Connection(i, args) for i in range(args.connections)]
+    threads = max(1, min(args.threads, len(connections)))
+    output = contextlib.nullcontext(sys.stdout) if args.verbose else open(os.devnull, 'w')
+
+    try:
+        # NetworkClient wypisuje komunikat na każde połączenie
+        with output as stream, contextlib.redirect_stdout(stream):
+            connect_started = time.perf_counter()
+            connected = connect_all(connections, threads)
+            connect_seconds = time.perf_counter() - connect_started
+            if not connected:
+                raise SystemExit("[LOADGEN] No connections could be established.")
+
+            drivers = [Driver(connected[i::threads], args.batch / args.rate) for i in range(threads)]
+            drivers = [d for d in drivers if d.connections]
+            monitor.start()
+            start_time = time.perf_counter()
+            for driver in drivers:
+                driver.start_time = start_time
+                driver.end_time = start_time + args.duration
+                driver.start()
+            for driver in drivers:
+                driver.join()
+            elapsed = time.perf_counter() - start_time
+            monitor.stop()
+
+            for connection in connected:
+                connection.client.close()
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join(timeout=5)
+            if server_process.is_alive():
+                server_process.kill()
+
+    latencies = sorted(latency for d in drivers for latency in d.latencies)
+    sent_readings = sum(d.sent_readings for d in drivers)
+    cpu_seconds = monitor.cpu_seconds()
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "server_mode": args.server_mode, "workers": args.workers, "connections": args.connections,
+            "rate_per_connection": args.rate, "duration_s": args.duration, "batch": args.batch,
+            "window": args.window, "protocol": args.protocol, "threads": threads,
+        },
+        "connected": len(connected),
+        "connect_seconds": connect_seconds,
+        "elapsed_s": elapsed,
+        "readings_sent": sent_readings,
+        "sends": len(latencies),
+        "send_failures": sum(d.failed for d in drivers),
+        "late_sends": sum(d.late for d in drivers),
+        "target_readings_per_s": len(connected) * args.rate,
+        "readings_per_s": sent_readings / elapsed if elapsed else 0.0,
+        "latency_kind": "ack_rtt" if args.window == 0 else "send_call",
+        "latency_ms": {name: (percentile(latencies, pct) * 1000 if latencies else None) for name, pct in PERCENTILES},
+        "server": {
+            "pid": server_pid,
+            "cpu_seconds": cpu_seconds,
+            "cpu_percent": (cpu_seconds / elapsed * 100) if cpu_seconds is not None and elapsed else None,
+            "rss_peak_mb": monitor.peak_rss / 1024 / 1024 if monitor.sampled else None,
+            "rss_end_mb": monitor.last_rss / 1024 / 1024 if monitor.sampled else None,
+        },
+    }
+    if latencies:
+        result["latency_ms"]["max"] = latencies[-1] * 1000
+        result["latency_ms"]["mean"] = sum(latencies) / len(latencies) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load generator for NetworkServer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--server-mode", choices=("threaded", "asyncio", "multiprocess", "none"), default="threaded",
+                        help="serwer uruchamiany na czas testu; 'none' = serwer zewnętrzny")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID zewnętrznego serwera (CPU/RSS)")
+    parser.add_argument("--workers", type=int, default=None, help="procesy robocze w trybie multiprocess")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=10.0, help="odczytów na sekundę na połączenie")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help=">1: odczyty wysyłane ramką wsadową")
+    parser.add_argument("--window", type=int, default=0, help="window_size klienta (0 = stop-and-wait)")
+    parser.add_argument("--protocol", choices=("json", "binary"), default="json")
+    parser.add_argument("--threads", type=int, default=64, help="wątki wysyłające")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--output", help="plik wynikowy JSON (domyślnie tylko stdout)")
+    parser.add_argument("--verbose", action="store_true", help="nie wyciszaj komunikatów NetworkClient")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Porównanie formatu JSON (linie) i binarnego (network/protocol.py):
+bajty na odczyt oraz czas dekodowania po stronie serwera (µs na odczyt).
+"binary" mierzy dekodowanie do RecordBlock przekazywanych do data_callback (kolumny),
+"bin-raw" - samo rozpakowanie rekordów struct.
+
+Uruchomienie z katalogu projektu:  python -m benchmarks.protocol_bench [--readings 20000] [--batch 50]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from network import protocol
+from sensors import TemperatureSensor, HumiditySensor, PressureSensor, LightSensor
+
+
+def generate_readings(count):
+    sensors = [TemperatureSensor("temp01"), HumiditySensor("hum01"), PressureSensor("press01"), LightSensor("light01")]
+    start = datetime.now()
+    readings = []
+    for i in range(count):
+        sensor = sensors[i % len(sensors)]
+        readings.append({
+            "timestamp": (start + timedelta(milliseconds=i)).isoformat(),
+            "sensor_id": sensor.sensor_id,
+            "value": sensor.read_value(),
+            "unit": sensor.unit
+        })
+    return readings
+
+
+def encode_json(readings, batch_size):
+    if batch_size <= 1:
+        return [json.dumps(r).encode('utf-8') + b'\n' for r in readings]
+    return [json.dumps({"type": "batch", "readings": readings[i:i + batch_size]}).encode('utf-8') + b'\n'
+            for i in range(0, len(readings), batch_size)]
+
+
+def encode_binary(readings, batch_size):
+    encoder = protocol.BinaryEncoder()
+    if batch_size <= 1:
+        return [encoder.encode(r) for r in readings]
+    return [encoder.encode({"type": "batch", "readings": readings[i:i + batch_size]})
+            for i in range(0, len(readings), batch_size)]
+
+
+def decode_json(messages):
+    decoded = 0
+    for line in messages:
+        data = json.loads(str(memoryview(line)[:-1], 'utf-8'))
+        decoded += len(data["readings"]) if data.get("type") == "batch" else 1
+    return decoded
+
+
+def decode_binary(messages):
+    decoder = protocol.BinaryDecoder()
+    header = protocol.FRAME_HEADER
+    decoded = 0
+    for message in messages:
+        view = memoryview(message)
+        offset = 0
+        while offset < len(view):
+            length, frame_type, _ = header.unpack_from(view, offset)
+            payload = view[offset + header.size:offset + header.size + length]
+            offset += header.size + length
+            if frame_type == protocol.FRAME_DEFINE:
+                decoder.define(payload)
+            else:
+                decoded += len(decoder.decode_records(payload))
+    return decoded
+
+
+def unpack_binary(messages):
+    """Same rozpakowanie rekordów (bez zamiany kodów na napisy i budowania kolumn RecordBlock)."""
+    header = protocol.FRAME_HEADER
+    decoded = 0
+    for message in messages:
+        view = memoryview(message)
+        offset = 0
+        while offset < len(view):
+            length, frame_type, _ = header.unpack_from(view, offset)
+            if frame_type != protocol.FRAME_DEFINE:
+                decoded += len(list(protocol.RECORD.iter_unpack(view[offset + header.size:offset + header.size + length])))
+            offset += header.size + length
+    return decoded
+
+
+def measure(name, encode, decode, readings, batch_size, repeats):
+    messages = encode(readings, batch_size)
+    total_bytes = sum(len(m) for m in messages)
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        decoded = decode(messages)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert decoded == len(readings)
+    return {
+        "format": name,
+        "batch_size": batch_size,
+        "bytes_per_reading": total_bytes / len(readings),
+        "decode_us_per_reading": best / len(readings) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON vs binary wire format benchmark")
+    parser.add_argument("--readings", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    readings = generate_readings(args.readings)
+    results = []
+    for batch_size in (1, args.batch):
+        results.append(measure("json", encode_json, decode_json, readings, batch_size, args.repeats))
+        results.append(measure("binary", encode_binary, decode_binary, readings, batch_size, args.repeats))
+        results.append(measure("bin-raw", encode_binary, unpack_binary, readings, batch_size, args.repeats))
+
+    print(f"{'format':<8} {'batch':>6} {'bytes/reading':>14} {'decode µs/reading':>18}")
+    for r in results:
+        print(f"{r['format']:<8} {r['batch_size']:>6} {r['bytes_per_reading']:>14.1f} {r['decode_us_per_reading']:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Kolumnowy format segmentów archiwum Loggera (storage = "columnar" w config.json).
+
+Plik .col (little-endian):
+  MAGIC
+  dla każdego czujnika (dane posortowane po czasie, tablice wyrównane do 8 bajtów):
+    timestamps - int64, mikrosekundy od 1970-01-01 czasu zapisanego w logu (naiwnego, jak w CSV)
+    values     - float64 (NaN dla wartości nieliczbowych)
+    units      - uint16, kody jednostek; tylko gdy czujnik ma więcej niż jedną jednostkę
+  stopka JSON: słowniki sensor_id / unit oraz dla każdego czujnika offsety tablic i porcje
+               (chunks) po CHUNK_ROWS wierszy z min/max czasu i wartości
+  TRAILER: offset i długość stopki, MAGIC
+
+Kolumny czujnika są ciągłe, więc ColumnarSegment udostępnia je przez mmap jako tablice NumPy bez kopiowania.
+
+Konwersja istniejących archiwów CSV/ZIP:
+    python columnar.py config.json [--keep]
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"SENSCOL1"
+TRAILER = struct.Struct('<QQ8s')  # offset stopki, długość stopki, MAGIC
+FORMAT_VERSION = 1
+CHUNK_ROWS = 65536
+_ALIGNMENT = 8
+
+
+def write_segment(path: str, timestamps, values, sensor_ids, units, source: str = None,
+                  chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Zapisuje segment kolumnowy. timestamps: datetime64, values: float64, sensor_ids / units: tablice
+    napisów (po jednym na wiersz). Zwraca statystyki segmentu w formacie katalogu archiwów Loggera.
+    """
+    timestamps = np.asarray(timestamps, dtype='datetime64[us]').astype(np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    sensor_names, sensor_codes = np.unique(np.asarray(sensor_ids, dtype=str), return_inverse=True)
+    unit_names, unit_codes = np.unique(np.asarray(units, dtype=str), return_inverse=True)
+    sensor_codes = sensor_codes.reshape(-1)
+    unit_codes = unit_codes.reshape(-1).astype(np.uint16)
+
+    order = np.lexsort((timestamps, sensor_codes))  # czujnik, potem czas; stabilnie
+    timestamps, values = timestamps[order], values[order]
+    sensor_codes, unit_codes = sensor_codes[order], unit_codes[order]
+    bounds = np.searchsorted(sensor_codes, np.arange(len(sensor_names) + 1))
+
+    sensors = []
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+
+        def put(array) -> int:
+            f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+            offset = f.tell()
+            f.write(array.tobytes())
+            return offset
+
+        for code in range(len(sensor_names)):
+            lo, hi = int(bounds[code]), int(bounds[code + 1])
+            sensor_units = unit_codes[lo:hi]
+            single_unit = bool((sensor_units == sensor_units[0]).all())
+            sensors.append({
+                "sensor": code,
+                "rows": hi - lo,
+                "timestamps": put(timestamps[lo:hi]),
+                "values": put(values[lo:hi]),
+                "unit": int(sensor_units[0]) if single_unit else None,
+                "units": None if single_unit else put(sensor_units),
+                "chunks": [_chunk_stats(timestamps, values, start, min(start + chunk_rows, hi), lo)
+                           for start in range(lo, hi, chunk_rows)],
+            })
+
+        footer = json.dumps({
+            "version": FORMAT_VERSION,
+            "source": source,
+            "sensor_ids": sensor_names.tolist(),
+            "units": unit_names.tolist(),
+            "sensors": sensors,
+        }).encode('utf-8')
+        footer_offset = f.tell()
+        f.write(footer)
+        f.write(TRAILER.pack(footer_offset, len(footer), MAGIC))
+
+    return _segment_stats(timestamps, sensor_names.tolist())
+
+
+def _chunk_stats(timestamps, values, start: int, end: int, sensor_start: int) -> dict:
+    chunk_values = values[start:end]
+    finite = chunk_values[~np.isnan(chunk_values)]
+    return {
+        "start": start - sensor_start,
+        "rows": end - start,
+        "min_timestamp": int(timestamps[start]),
+        "max_timestamp": int(timestamps[end - 1]),
+        "min_value": float(finite.min()) if len(finite) else None,
+        "max_value": float(finite.max()) if len(finite) else None,
+    }
+
+
+def _segment_stats(ticks, sensor_ids: list) -> dict:
+    # "sorted": query() zwraca wiersze segmentu zawsze w kolejności czasu.
+    stats = {"min_timestamp": None, "max_timestamp": None, "rows": len(ticks), "sensors": set(sensor_ids),
+             "sorted": True}
+    if len(ticks):
+        bounds = np.array([ticks.min(), ticks.max()]).astype('datetime64[us]').tolist()
+        stats["min_timestamp"], stats["max_timestamp"] = (ts.isoformat() for ts in bounds)
+    return stats
+
+
+class ColumnarSegment:
+    """
+    Segment kolumnowy otwarty przez mmap. columns() zwraca widoki na plik (bez kopiowania),
+    query() - kopie wierszy z przedziału czasu, wybierane po statystykach porcji.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self._mmap) < len(MAGIC) + TRAILER.size or self._mmap[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"'{path}' is not a columnar segment")
+            footer_offset, footer_length, magic = TRAILER.unpack_from(self._mmap, len(self._mmap) - TRAILER.size)
+            if magic != MAGIC:
+                raise ValueError(f"'{path}' is truncated")
+            footer = json.loads(self._mmap[footer_offset:footer_offset + footer_length].decode('utf-8'))
+        except Exception:
+            self.close()
+            raise
+        if footer.get("version") != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported columnar segment version in '{path}': {footer.get('version')}")
+
+        self.source = footer.get("source")
+        self.sensor_ids = footer["sensor_ids"]
+        self.units = footer["units"]
+        self._sensors = {self.sensor_ids[meta["sensor"]]: meta for meta in footer["sensors"]}
+
+    def close(self) -> None:
+        if getattr(self, "_mmap", None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # istnieją jeszcze widoki z columns() - mapowanie zwolni GC
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def rows(self) -> int:
+        return sum(meta["rows"] for meta in self._sensors.values())
+
+    def stats(self) -> dict:
+        """Statystyki segmentu w formacie katalogu archiwów (z samej stopki)."""
+        chunks = [chunk for meta in self._sensors.values() for chunk in meta["chunks"]]
+        ticks = np.array([c["min_timestamp"] for c in chunks] + [c["max_timestamp"] for c in chunks], dtype=np.int64)
+        stats = _segment_stats(ticks, list(self._sensors))
+        stats["rows"] = self.rows
+        return stats
+
+    def columns(self, sensor_id: str) -> dict:
+        """Kolumny jednego czujnika jako widoki na zmapowany plik: timestamp (datetime64[us]), value, unit_code."""
+        meta = self._sensors.get(sensor_id)
+        if meta is None:
+            return {"timestamp": np.empty(0, dtype='datetime64[us]'), "value": np.empty(0, dtype=np.float64),
+                    "unit_code": np.empty(0, dtype=np.uint16)}
+        rows = meta["rows"]
+        if meta["units"] is None:
+            unit_codes = np.full(rows, meta["unit"], dtype=np.uint16)
+        else:
+            unit_codes = np.frombuffer(self._mmap, dtype='<u2', count=rows, offset=meta["units"])
+        return {
+            "timestamp": np.frombuffer(self._mmap, dtype='<i8', count=rows, offset=meta["timestamps"])
+                           .view('datetime64[us]'),
+            "value": np.frombuffer(self._mmap, dtype='<f8', count=rows, offset=meta["values"]),
+            "unit_code": unit_codes,
+        }
+
+    def query(self, start, end, sensor_id: str = None):
+        """
+        Wiersze z przedziału [start, end] (datetime64[us]) posortowane po czasie:
+        (timestamp, value, sensor_code, unit_code). Porcje spoza przedziału nie są czytane.
+        """
+        start_us, end_us = int(start.astype(np.int64)), int(end.astype(np.int64))
+        parts = []
+        names = [sensor_id] if sensor_id is not None else list(self._sensors)
+        for name in names:
+            meta = self._sensors.get(name)
+            if meta is None:
+                continue
+            chunks = [c for c in meta["chunks"] if c["max_timestamp"] >= start_us and c["min_timestamp"] <= end_us]
+            if not chunks:
+                continue
+            lo = chunks[0]["start"]
+            hi = chunks[-1]["start"] + chunks[-1]["rows"]
+            columns = self.columns(name)
+            ticks = columns["timestamp"][lo:hi].view(np.int64)
+            lo, hi = lo + int(np.searchsorted(ticks, start_us, 'left')), lo + int(np.searchsorted(ticks, end_us, 'right'))
+            if hi > lo:
+                parts.append((columns["timestamp"][lo:hi], columns["value"][lo:hi],
+                              np.full(hi - lo, meta["sensor"], dtype=np.int32), columns["unit_code"][lo:hi]))
+
+        if not parts:
+            return (np.empty(0, dtype='datetime64[us]'), np.empty(0, dtype=np.float64),
+                    np.empty(0, dtype=np.int32), np.empty(0, dtype=np.uint16))
+        # concatenate kopiuje - wynik nie trzyma mapowania pliku
+        timestamps, values, sensor_codes, unit_codes = (np.concatenate(column) for column in zip(*parts))
+        if len(parts) > 1:
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values, sensor_codes, unit_codes = (timestamps[order], values[order],
+                                                            sensor_codes[order], unit_codes[order])
+        return timestamps, values, sensor_codes, unit_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Logger CSV/ZIP archives to columnar segments.")
+    parser.add_argument("config", help="Logger config file (config.json)")
+    parser.add_argument("--keep", action="store_true", help="keep the source archives after conversion")
+    args = parser.parse_args()
+
+    from logger import Logger
+    logger = Logger(args.config)
+    converted = logger.convert_archives(remove_source=not args.keep)
+    print(f"Converted {converted} archive(s) in '{logger.archive_dir}' to columnar segments.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,143 @@
+import bisect
 import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import threading
+import time
 from datetime import datetime, timedelta
 import json
+import math
 import os
 from collections import deque
 import queue
 
+try:
+    import numpy as np
+except ImportError:  # numpy potrzebny tylko dla storage_mode = "numpy"
+    np = None
+
+from network import protocol
 from server.server import NetworkServer
+from server.async_server import AsyncNetworkServer
+from server.multiproc import MultiProcessNetworkServer
+from logger import Logger
 
 GUI_CONFIG_FILE = "gui_config.json"
 MAX_DATA_AGE_SECONDS = 12 * 60 * 60
 DATA_POINTS_LIMIT_PER_SENSOR = 5000
+MESSAGE_QUEUE_LIMIT = 10000  # wiadomości (zwykle paczki odczytów) czekające na wątek Tk
+INGEST_BUDGET_SECONDS = 0.03  # maks. czas przetwarzania kolejki w jednym takcie pętli Tk
+AVERAGE_WINDOWS_SECONDS = (3600, 12 * 3600)  # okna z agregatami utrzymywanymi przyrostowo (średnie w tabeli)
+TABLE_REFRESH_INTERVAL_MS = 1200  # najkrótszy odstęp odświeżania tabeli
+TABLE_REFRESH_MAX_INTERVAL_MS = 10000
+TABLE_REFRESH_LOAD = 0.1  # maks. część czasu pętli Tk poświęcana na odświeżanie tabeli
+CHART_WINDOW_SECONDS = 3600  # zakres czasu wykresu
+CHART_REFRESH_MS = 1000
+CHART_MARGIN = 60  # px po lewej na opisy osi Y
+CHART_COLORS = ("#1f77b4", "#d62728", "#2ca02c", "#ff7f0e", "#9467bd", "#8c564b", "#e377c2", "#17becf")
+WARM_START_ROWS_PER_MESSAGE = 20000  # punktów historii w jednej wiadomości (mieści się w INGEST_BUDGET_SECONDS)
+RING_BUFFER_CAPACITY = 1 << 16  # punktów na czujnik w storage_mode "numpy": ~18h przy 1 Hz, 1 MiB
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(dt):
+    """Czas naiwny (jak w odczytach) -> mikrosekundy od 1970-01-01."""
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _now_seconds():
+    return _to_epoch_us(datetime.now()) / 1e6
+
+
+class _WindowAggregate:
+    """
+    Agregaty odczytów jednego czujnika z ostatnich `seconds` sekund: suma bieżąca oraz kolejki
+    monotoniczne minimum i maksimum. Okno trzyma referencje do tych samych krotek (timestamp, value)
+    co historia czujnika, więc odczyt usuwany z historii jest rozpoznawany po tożsamości.
+    """
+    __slots__ = ("seconds", "readings", "total", "mins", "maxs")
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.readings = deque()
+        self.total = 0.0
+        self.mins = deque()  # wartości rosnące - mins[0] to minimum okna
+        self.maxs = deque()  # wartości malejące - maxs[0] to maksimum okna
+
+    def push(self, reading):
+        value = reading[1]
+        self.readings.append(reading)
+        self.total += value
+        while self.mins and self.mins[-1][1] >= value:
+            self.mins.pop()
+        self.mins.append(reading)
+        while self.maxs and self.maxs[-1][1] <= value:
+            self.maxs.pop()
+        self.maxs.append(reading)
+
+    def pop_oldest(self):
+        reading = self.readings.popleft()
+        if self.mins[0] is reading:
+            self.mins.popleft()
+        if self.maxs[0] is reading:
+            self.maxs.popleft()
+        self.total = self.total - reading[1] if self.readings else 0.0  # bez dryfu sumy po opróżnieniu
+
+    def expire(self, cutoff_time):
+        # Odczyty wychodzą z okna w kolejności przyjścia (historia jest uporządkowana po czasie dodania).
+        while self.readings and self.readings[0][0] < cutoff_time:
+            self.pop_oldest()
 
 
 class SensorDataStore:
-    def __init__(self):
+    def __init__(self, windows=AVERAGE_WINDOWS_SECONDS):
 
         self.sensor_readings = {}
         self.sensor_metadata = {}
+        self.windows = tuple(windows)
+        self._window_aggregates = {}  # sensor_id -> [_WindowAggregate dla każdego okna z self.windows]
 
     def add_reading(self, sensor_id, timestamp_dt, value, unit):
-        if sensor_id not in self.sensor_readings:
-            self.sensor_readings[sensor_id] = deque(maxlen=DATA_POINTS_LIMIT_PER_SENSOR)
-
-
-        now = datetime.now()
-        if self.sensor_readings[sensor_id]:
-            while self.sensor_readings[sensor_id] and \
-                    (now - self.sensor_readings[sensor_id][0][0]).total_seconds() > MAX_DATA_AGE_SECONDS:
-                self.sensor_readings[sensor_id].popleft()
-
-        self.sensor_readings[sensor_id].append((timestamp_dt, float(value)))
-
+        self.add_readings([(sensor_id, timestamp_dt, value, unit)])
+
+    def add_readings(self, readings):
+        """
+        Dodaje wiele odczytów (sensor_id, timestamp_dt, value, unit) naraz. Każdy odczyt trafia
+        do historii, ale usuwanie starych danych i metadane do wyświetlania (ostatnia wartość)
+        są aktualizowane raz na czujnik.
+        """
+        latest = {}
+        for sensor_id, timestamp_dt, value, unit in readings:
+            if sensor_id not in self.sensor_readings:
+                self.sensor_readings[sensor_id] = deque(maxlen=DATA_POINTS_LIMIT_PER_SENSOR)
+                self._window_aggregates[sensor_id] = [_WindowAggregate(seconds) for seconds in self.windows]
+            history = self.sensor_readings[sensor_id]
+            if len(history) == history.maxlen:
+                self._drop_oldest(sensor_id)  # deque usunąłby go sam, ale okna muszą go odjąć
+            reading = (timestamp_dt, float(value))
+            history.append(reading)
+            for window in self._window_aggregates[sensor_id]:
+                window.push(reading)
+            latest[sensor_id] = (timestamp_dt, reading[1], unit)
+
+        cutoff_time = datetime.now() - timedelta(seconds=MAX_DATA_AGE_SECONDS)
+        for sensor_id, (timestamp_dt, value, unit) in latest.items():
+            history = self.sensor_readings[sensor_id]
+            while history and history[0][0] < cutoff_time:
+                self._drop_oldest(sensor_id)
+
+            self._update_metadata(sensor_id, timestamp_dt, value, unit)
+
+    def add_records(self, records):
+        """Dodaje odczyty z ramek binarnych (protocol.RecordBlock - kolumny zamiast słowników)."""
+        self.add_readings(zip(records.sensor_ids, records.datetimes(), records.values, records.units))
+
+    def _update_metadata(self, sensor_id, timestamp_dt, value, unit):
         if sensor_id not in self.sensor_metadata:
             self.sensor_metadata[sensor_id] = {}
         self.sensor_metadata[sensor_id]['unit'] = unit
-        self.sensor_metadata[sensor_id]['last_value'] = float(value)
+        self.sensor_metadata[sensor_id]['last_value'] = value
         self.sensor_metadata[sensor_id]['last_timestamp_dt'] = timestamp_dt
 
     def get_last_reading(self, sensor_id):
@@ -50,44 +150,502 @@ class SensorDataStore:
             }
         return None
 
-    def calculate_average(self, sensor_id, timespan_seconds):
+    def _drop_oldest(self, sensor_id):
+        reading = self.sensor_readings[sensor_id].popleft()
+        for window in self._window_aggregates[sensor_id]:
+            if window.readings and window.readings[0] is reading:
+                window.pop_oldest()
+
+    def get_window_stats(self, sensor_id, timespan_seconds):
+        """
+        count / mean / min / max odczytów z ostatnich timespan_seconds sekund albo None.
+        Dla okien z self.windows - O(1) (zamortyzowane) z agregatów; dla innych - przegląd historii.
+        """
         if sensor_id not in self.sensor_readings:
             return None
+        cutoff_time = datetime.now() - timedelta(seconds=timespan_seconds)
+
+        for window in self._window_aggregates[sensor_id]:
+            if window.seconds == timespan_seconds:
+                window.expire(cutoff_time)
+                if not window.readings:
+                    return None
+                count = len(window.readings)
+                return {"count": count, "mean": window.total / count,
+                        "min": window.mins[0][1], "max": window.maxs[0][1]}
+
+        relevant_readings = [val for ts, val in self.sensor_readings[sensor_id] if ts >= cutoff_time]
+        if not relevant_readings:
+            return None
+        return {"count": len(relevant_readings), "mean": sum(relevant_readings) / len(relevant_readings),
+                "min": min(relevant_readings), "max": max(relevant_readings)}
+
+    def calculate_average(self, sensor_id, timespan_seconds):
+        stats = self.get_window_stats(sensor_id, timespan_seconds)
+        return stats["mean"] if stats else None
+
+    def load_history(self, sensor_id, ticks_us, values, unit):
+        """
+        Wczytuje historyczne odczyty czujnika (czasy w µs od 1970-01-01, rosnąco) przed odczytami, które
+        już są w magazynie: tylko starsze od nich i nie starsze niż MAX_DATA_AGE_SECONDS.
+        """
+        history = self.sensor_readings.get(sensor_id) or ()
+        lo = bisect.bisect_left(ticks_us, _to_epoch_us(datetime.now() - timedelta(seconds=MAX_DATA_AGE_SECONDS)))
+        hi = bisect.bisect_left(ticks_us, _to_epoch_us(history[0][0])) if history else len(ticks_us)
+        lo = max(lo, hi - (DATA_POINTS_LIMIT_PER_SENSOR - len(history)))  # najnowsze, które się zmieszczą
+        if lo >= hi:
+            return
 
-        relevant_readings = []
-        now = datetime.now()
-        cutoff_time = now - timedelta(seconds=timespan_seconds)
+        readings = [(_EPOCH + timedelta(microseconds=int(t)), float(v)) for t, v in zip(ticks_us[lo:hi], values[lo:hi])]
+        self.sensor_readings[sensor_id] = deque(readings + list(history), maxlen=DATA_POINTS_LIMIT_PER_SENSOR)
+        windows = self._window_aggregates[sensor_id] = [_WindowAggregate(seconds) for seconds in self.windows]
+        for reading in self.sensor_readings[sensor_id]:
+            for window in windows:
+                window.push(reading)
+        if sensor_id not in self.sensor_metadata:
+            self._update_metadata(sensor_id, readings[-1][0], readings[-1][1], unit)
+
+    def get_series(self, sensor_id, since_seconds=None):
+        """
+        Odczyty nowsze niż since_seconds (s od 1970-01-01) w kolejności dodania: (czasy w s, wartości).
+        Historia przeglądana od końca - koszt proporcjonalny do liczby nowych odczytów.
+        """
+        history = self.sensor_readings.get(sensor_id)
+        if not history:
+            return [], []
+        times, values = [], []
+        for timestamp_dt, value in reversed(history):
+            seconds = _to_epoch_us(timestamp_dt) / 1e6
+            if since_seconds is not None and seconds <= since_seconds:
+                break
+            times.append(seconds)
+            values.append(value)
+        times.reverse()
+        values.reverse()
+        return times, values
 
+    def get_all_sensor_ids(self):
+        return list(self.sensor_readings.keys())
 
-        for ts, val in list(self.sensor_readings[sensor_id]):
-            if ts >= cutoff_time:
-                relevant_readings.append(val)
 
-        if not relevant_readings:
+class _RingBuffer:
+    """
+    Bufor cykliczny odczytów jednego czujnika: znaczniki czasu (int64, µs od 1970-01-01) i wartości
+    (float64) w tablicach przydzielonych z góry - 16 bajtów na punkt. Przy pełnym buforze nowe
+    odczyty nadpisują najstarsze.
+    """
+    def __init__(self, capacity):
+        self.timestamps = np.empty(capacity, dtype=np.int64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.start = 0
+        self.size = 0
+        # Znaczniki niemalejące - okna wyznacza searchsorted; po odczycie spoza kolejności
+        # (do opróżnienia bufora) maska.
+        self.ordered = True
+
+    def __len__(self):
+        return self.size
+
+    def _segments(self):
+        """Zakresy indeksów zajętej części bufora w kolejności dodania (jeden lub dwa)."""
+        capacity = len(self.values)
+        end = self.start + self.size
+        if end <= capacity:
+            return [(self.start, end)]
+        return [(self.start, capacity), (0, end - capacity)]
+
+    def extend(self, ticks, values):
+        capacity = len(self.values)
+        if len(ticks) >= capacity:
+            ticks, values = ticks[-capacity:], values[-capacity:]
+            self.start = self.size = 0
+            self.ordered = True
+        if not len(ticks):
+            return
+        if self.ordered:
+            previous = self.timestamps[(self.start + self.size - 1) % capacity] if self.size else ticks[0]
+            self.ordered = bool(previous <= ticks[0] and (ticks[1:] >= ticks[:-1]).all())
+
+        position = (self.start + self.size) % capacity
+        first = min(len(ticks), capacity - position)
+        self.timestamps[position:position + first] = ticks[:first]
+        self.values[position:position + first] = values[:first]
+        rest = len(ticks) - first
+        if rest:
+            self.timestamps[:rest] = ticks[first:]
+            self.values[:rest] = values[first:]
+
+        overflow = self.size + len(ticks) - capacity
+        if overflow > 0:
+            self.start = (self.start + overflow) % capacity
+            self.size = capacity
+        else:
+            self.size += len(ticks)
+
+    def expire(self, cutoff_us):
+        """Usuwa z początku bufora odczyty starsze niż cutoff_us."""
+        expired = 0
+        for lo, hi in self._segments():
+            ticks = self.timestamps[lo:hi]
+            if self.ordered:
+                count = int(np.searchsorted(ticks, cutoff_us, 'left'))
+            else:
+                below = ticks < cutoff_us
+                count = len(ticks) if below.all() else int(below.argmin())
+            expired += count
+            if count < len(ticks):
+                break
+        if expired:
+            self.start = (self.start + expired) % len(self.values)
+            self.size -= expired
+            if not self.size:
+                self.ordered = True
+
+    def window(self, cutoff_us):
+        """Fragmenty (timestamps, values) z odczytami o czasie >= cutoff_us; widoki, gdy bufor uporządkowany."""
+        parts = []
+        for lo, hi in self._segments():
+            if self.ordered:
+                lo += int(np.searchsorted(self.timestamps[lo:hi], cutoff_us, 'left'))
+                parts.append((self.timestamps[lo:hi], self.values[lo:hi]))
+            else:
+                mask = self.timestamps[lo:hi] >= cutoff_us
+                parts.append((self.timestamps[lo:hi][mask], self.values[lo:hi][mask]))
+        return [part for part in parts if len(part[0])]
+
+    def window_stats(self, cutoff_us):
+        parts = [values for _, values in self.window(cutoff_us)]
+        if not parts:
+            return None
+        count = sum(len(values) for values in parts)
+        return {"count": count, "mean": float(sum(values.sum() for values in parts)) / count,
+                "min": float(min(values.min() for values in parts)),
+                "max": float(max(values.max() for values in parts))}
+
+
+class RingBufferSensorDataStore(SensorDataStore):
+    """
+    SensorDataStore z historią w buforach cyklicznych NumPy (storage_mode = "numpy" w gui_config.json):
+    16 bajtów na punkt zamiast krotki z datetime i float, więc bufor mieści pełne okno 12h.
+    Okna liczone wektorowo (searchsorted na posortowanych znacznikach czasu).
+    """
+    def __init__(self, capacity=RING_BUFFER_CAPACITY):
+        super().__init__(windows=())
+        self.capacity = capacity
+
+    def add_readings(self, readings):
+        latest = {}
+        grouped = {}  # sensor_id -> (znaczniki µs, wartości) - jeden zapis do bufora na czujnik
+        for sensor_id, timestamp_dt, value, unit in readings:
+            columns = grouped.get(sensor_id)
+            if columns is None:
+                columns = grouped[sensor_id] = ([], [])
+            value = float(value)
+            columns[0].append(_to_epoch_us(timestamp_dt))
+            columns[1].append(value)
+            latest[sensor_id] = (timestamp_dt, value, unit)
+
+        self._extend_grouped(grouped)
+        for sensor_id, (timestamp_dt, value, unit) in latest.items():
+            self._update_metadata(sensor_id, timestamp_dt, value, unit)
+
+    def add_records(self, records):
+        # Znaczniki µs prosto z kolumn - datetime powstaje tylko dla ostatniego odczytu czujnika.
+        latest = {}
+        grouped = {}
+        for sensor_id, tick, value, unit in zip(records.sensor_ids, records.local_us(), records.values, records.units):
+            columns = grouped.get(sensor_id)
+            if columns is None:
+                columns = grouped[sensor_id] = ([], [])
+            columns[0].append(tick)
+            columns[1].append(value)
+            latest[sensor_id] = (tick, value, unit)
+
+        self._extend_grouped(grouped)
+        for sensor_id, (tick, value, unit) in latest.items():
+            self._update_metadata(sensor_id, _EPOCH + tick * _MICROSECOND, value, unit)
+
+    def _extend_grouped(self, grouped):
+        cutoff_us = _to_epoch_us(datetime.now() - timedelta(seconds=MAX_DATA_AGE_SECONDS))
+        for sensor_id, (ticks, values) in grouped.items():
+            history = self.sensor_readings.get(sensor_id)
+            if history is None:
+                history = self.sensor_readings[sensor_id] = _RingBuffer(self.capacity)
+            history.extend(np.array(ticks, dtype=np.int64), np.array(values, dtype=np.float64))
+            history.expire(cutoff_us)
+
+    def get_window_stats(self, sensor_id, timespan_seconds):
+        history = self.sensor_readings.get(sensor_id)
+        if history is None:
             return None
-        return sum(relevant_readings) / len(relevant_readings)
+        return history.window_stats(_to_epoch_us(datetime.now() - timedelta(seconds=timespan_seconds)))
+
+    def load_history(self, sensor_id, ticks_us, values, unit):
+        history = self.sensor_readings.get(sensor_id)
+        ticks_us = np.asarray(ticks_us, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        cutoff_us = _to_epoch_us(datetime.now() - timedelta(seconds=MAX_DATA_AGE_SECONDS))
+        lo = int(np.searchsorted(ticks_us, cutoff_us, 'left'))
+        hi = int(np.searchsorted(ticks_us, history.timestamps[history.start], 'left')) if history else len(ticks_us)
+        if lo >= hi:
+            return
 
-    def get_all_sensor_ids(self):
-        return list(self.sensor_readings.keys())
+        # Nowy bufor: historia, potem dotychczasowe odczyty (przy przepełnieniu zostają najnowsze).
+        buffer = _RingBuffer(self.capacity)
+        buffer.extend(ticks_us[lo:hi], values[lo:hi])
+        if history:
+            for ticks, part_values in history.window(np.iinfo(np.int64).min):
+                buffer.extend(ticks, part_values)
+        self.sensor_readings[sensor_id] = buffer
+        if sensor_id not in self.sensor_metadata:
+            self._update_metadata(sensor_id, _EPOCH + timedelta(microseconds=int(ticks_us[hi - 1])),
+                                  float(values[hi - 1]), unit)
+
+    def get_series(self, sensor_id, since_seconds=None):
+        history = self.sensor_readings.get(sensor_id)
+        if history is None:
+            return [], []
+        cutoff_us = round(since_seconds * 1e6) + 1 if since_seconds is not None else np.iinfo(np.int64).min
+        parts = history.window(cutoff_us)
+        if not parts:
+            return [], []
+        ticks = np.concatenate([ticks for ticks, _ in parts])
+        values = np.concatenate([values for _, values in parts])
+        return (ticks / 1e6).tolist(), values.tolist()
+
+
+class _LttbStream:
+    """
+    Largest-Triangle-Three-Buckets na strumieniu punktów (t, v): kubełki o stałej szerokości w czasie
+    (wyrównane do 1970-01-01), z każdego jeden punkt - tworzący największy trójkąt z punktem wybranym
+    poprzednio i średnią następnego kubełka. Punkt kubełka jest więc znany dopiero po zamknięciu
+    następnego; tail() zwraca tymczasowe zakończenie przebiegu.
+    """
+    __slots__ = ("bucket_seconds", "selected", "pending", "current", "current_key")
+
+    def __init__(self, bucket_seconds):
+        self.bucket_seconds = bucket_seconds
+        self.selected = None  # ostatni wybrany punkt
+        self.pending = []  # zamknięty kubełek czekający na wybór punktu
+        self.current = []  # kubełek w trakcie napełniania
+        self.current_key = None
+
+    def feed(self, points):
+        """Dodaje punkty w kolejności czasu (NaN pomijane); zwraca nowo wybrane punkty."""
+        selected = []
+        for t, v in points:
+            if v != v:
+                continue
+            key = int(t // self.bucket_seconds)
+            if key != self.current_key and self.current:
+                self._close_bucket(selected)
+            self.current_key = key
+            self.current.append((t, v))
+        return selected
+
+    def _close_bucket(self, selected):
+        bucket, self.current = self.current, []
+        if self.selected is None:
+            # Pierwszy punkt przebiegu zostaje zawsze, jak w LTTB.
+            self.selected = bucket[0]
+            selected.append(bucket[0])
+            bucket = bucket[1:]
+        elif self.pending:
+            avg_t = sum(t for t, _ in bucket) / len(bucket)
+            avg_v = sum(v for _, v in bucket) / len(bucket)
+            sel_t, sel_v = self.selected
+            self.selected = max(self.pending, key=lambda p: abs((sel_t - avg_t) * (p[1] - sel_v)
+                                                                - (sel_t - p[0]) * (avg_v - sel_v)))
+            selected.append(self.selected)
+        self.pending = bucket
+
+    def tail(self):
+        return [bucket[-1] for bucket in (self.pending, self.current) if bucket]
+
+
+class _ChartSeries:
+    __slots__ = ("stream", "color", "last_time", "last_point", "segments", "tail_item")
+
+    def __init__(self, stream, color, last_time):
+        self.stream = stream
+        self.color = color
+        self.last_time = last_time  # czas ostatniego pobranego odczytu
+        self.last_point = None  # ostatni narysowany punkt wybrany przez LTTB
+        self.segments = deque()  # (id linii na Canvas, czas jej ostatniego punktu)
+        self.tail_item = None
+
+
+class SensorChart(tk.Canvas):
+    """
+    Wykres przebiegów wybranych czujników z ostatnich window_seconds sekund (Canvas, bez
+    dodatkowych zależności). Punkty zmniejszane przez LTTB do jednego na piksel szerokości.
+    refresh() rysuje przyrostowo: przesuwa istniejące linie (jedno canvas.move) i dokłada odcinek
+    z nowymi punktami. Pełne przerysowanie - tylko po zmianie czujników, rozmiaru lub zakresu osi Y.
+    """
+    def __init__(self, master, data_store, window_seconds=CHART_WINDOW_SECONDS, **kwargs):
+        super().__init__(master, background="white", highlightthickness=0, **kwargs)
+        self.data_store = data_store
+        self.window_seconds = window_seconds
+        self.sensor_ids = []
+        self._series = {}
+        self._y_range = (0.0, 1.0)
+        self._origin = 0.0  # czas na lewej krawędzi obszaru wykresu przy przesunięciu 0
+        self._shift = 0.0  # o ile pikseli linie zostały już przesunięte w lewo
+        self._seconds_per_px = 1.0
+        self._plot_box = (0, 0, 1, 1)
+        self.bind("<Configure>", lambda event: self.redraw())
+
+    def set_sensors(self, sensor_ids):
+        if list(sensor_ids) != self.sensor_ids:
+            self.sensor_ids = list(sensor_ids)
+            self.redraw()
+
+    def _x(self, t):
+        return self._plot_box[0] + (t - self._origin) / self._seconds_per_px - self._shift
+
+    def _y(self, v):
+        low, high = self._y_range
+        top, bottom = self._plot_box[1], self._plot_box[3]
+        return top + (high - v) / (high - low) * (bottom - top)
+
+    def redraw(self):
+        self.delete("all")
+        self._series = {}
+        width, height = self.winfo_width(), self.winfo_height()
+        if width <= CHART_MARGIN + 20 or height <= 40:
+            return
+        if not self.sensor_ids:
+            self.create_text(width / 2, height / 2, text="Select sensors in the table to plot their trends.",
+                             fill="gray")
+            return
+
+        self._plot_box = (CHART_MARGIN, 20, width - 10, height - 20)
+        self._seconds_per_px = self.window_seconds / (self._plot_box[2] - self._plot_box[0])
+        now = _now_seconds()
+        self._origin = now - self.window_seconds
+        self._shift = 0.0
+
+        drawn = {}
+        low, high = float("inf"), float("-inf")
+        for index, sensor_id in enumerate(self.sensor_ids):
+            times, values = self.data_store.get_series(sensor_id, self._origin)
+            series = _ChartSeries(_LttbStream(self._seconds_per_px), CHART_COLORS[index % len(CHART_COLORS)],
+                                  times[-1] if times else self._origin)
+            points = series.stream.feed(zip(times, values))
+            for _, v in points + series.stream.tail():
+                low, high = min(low, v), max(high, v)
+            self._series[sensor_id] = series
+            drawn[sensor_id] = points
+
+        if low > high:
+            low, high = 0.0, 1.0
+        padding = (high - low) * 0.1 or 1.0
+        self._y_range = (low - padding, high + padding)
+
+        for sensor_id, points in drawn.items():
+            self._draw_points(self._series[sensor_id], points)
+            self._draw_tail(self._series[sensor_id])
+        self._draw_axes()
+
+    def _draw_axes(self):
+        left, top, right, bottom = self._plot_box
+        low, high = self._y_range
+        # Maska marginesu - linie przesunięte poza lewą krawędź znikają pod nią.
+        self.create_rectangle(0, 0, left, bottom + 20, fill="white", outline="", tags=("axis",))
+        self.create_line(left, top, left, bottom, right, bottom, fill="gray", tags=("axis",))
+        self.create_text(left - 5, top, text=f"{high:.2f}", anchor=tk.E, tags=("axis",))
+        self.create_text(left - 5, bottom, text=f"{low:.2f}", anchor=tk.E, tags=("axis",))
+        self.create_text(left, bottom + 3, text=f"-{self.window_seconds // 60} min", anchor=tk.NW, tags=("axis",))
+        self.create_text(right, bottom + 3, text="now", anchor=tk.NE, tags=("axis",))
+        x = left
+        for sensor_id, series in self._series.items():
+            label = self.create_text(x, 3, text=sensor_id, fill=series.color, anchor=tk.NW, tags=("axis",))
+            x = self.bbox(label)[2] + 10
+
+    def _draw_points(self, series, points):
+        """Dorysowuje wybrane punkty serii jako nowy odcinek, połączony z poprzednim."""
+        if series.last_point is not None:
+            points = [series.last_point] + points
+        if len(points) >= 2:
+            coords = [c for t, v in points for c in (self._x(t), self._y(v))]
+            item = self.create_line(*coords, fill=series.color, tags=("series",))
+            series.segments.append((item, points[-1][0]))
+        if points:
+            series.last_point = points[-1]
+
+    def _draw_tail(self, series):
+        points = series.stream.tail()
+        if series.last_point is not None:
+            points = [series.last_point] + points
+        if len(points) < 2:
+            return
+        coords = [c for t, v in points for c in (self._x(t), self._y(v))]
+        if series.tail_item is None:
+            series.tail_item = self.create_line(*coords, fill=series.color, tags=("series",))
+        else:
+            self.coords(series.tail_item, *coords)
+
+    def refresh(self):
+        if not self._series:
+            return
+        now = _now_seconds()
+        shift = (now - self.window_seconds - self._origin) / self._seconds_per_px - self._shift
+        self.move("series", -shift, 0)
+        self._shift += shift
+
+        low, high = self._y_range
+        updates = {}
+        for sensor_id, series in self._series.items():
+            times, values = self.data_store.get_series(sensor_id, series.last_time)
+            if times:
+                series.last_time = times[-1]
+            points = series.stream.feed(zip(times, values))
+            for _, v in points + series.stream.tail():
+                if not low <= v <= high:
+                    self.redraw()  # wartości poza osią Y - nowy zakres
+                    return
+            updates[sensor_id] = points
+
+        cutoff = now - self.window_seconds
+        for sensor_id, points in updates.items():
+            series = self._series[sensor_id]
+            self._draw_points(series, points)
+            self._draw_tail(series)
+            while series.segments and series.segments[0][1] < cutoff:
+                self.delete(series.segments.popleft()[0])
+        self.tag_raise("axis")
 
 
 class ServerGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Sensor Network Server GUI")
-        self.geometry("800x600")
+        self.geometry("800x800")
 
-        self.port_var = tk.StringVar(value=self._load_gui_config().get("last_port", "9999"))
+        gui_config = self._load_gui_config()
+        self.port_var = tk.StringVar(value=gui_config.get("last_port", "9999"))
+        self.mode_var = tk.StringVar(value=gui_config.get("server_mode", "threaded"))
         self.server_instance = None
         self.server_thread = None
-        self.data_store = SensorDataStore()
-        self.message_queue = queue.Queue()
+        self.storage_mode = gui_config.get("storage_mode", "deque")
+        self.data_store = self._create_data_store(self.storage_mode)
+        # Wczytanie ostatnich warm_start_hours godzin z logów Loggera przy starcie; 0 = wyłączone.
+        self.warm_start_hours = gui_config.get("warm_start_hours", 0)
+        self.logger_config_path = gui_config.get("logger_config", "config.json")
+        self.message_queue = queue.Queue(maxsize=MESSAGE_QUEUE_LIMIT)
+        self._dropped_readings = 0
+        self._reported_dropped_readings = 0
+        self._table_rows = {}  # sensor_id -> (id wiersza w Treeview, wyświetlane wartości)
+        self._table_order = []  # posortowane sensor_id - pozycje wierszy w tabeli
 
         self._create_widgets()
         self.protocol("WM_DELETE_WINDOW", self._on_closing)
 
         self.after(100, self._process_message_queue)
-        self.after(1200, self._periodic_table_update)
+        self.after(TABLE_REFRESH_INTERVAL_MS, self._periodic_table_update)
+        self.after(CHART_REFRESH_MS, self._periodic_chart_update)
+        if self.warm_start_hours:
+            self._start_warm_start()
 
     def _load_gui_config(self):
         if os.path.exists(GUI_CONFIG_FILE):
@@ -98,8 +656,17 @@ class ServerGUI(tk.Tk):
                 return {}
         return {}
 
+    def _create_data_store(self, storage_mode):
+        if storage_mode == "numpy":
+            if np is not None:
+                return RingBufferSensorDataStore()
+            print("GUI: storage_mode 'numpy' requires numpy. Using 'deque'.")
+        return SensorDataStore()
+
     def _save_gui_config(self):
-        config = {"last_port": self.port_var.get()}
+        config = {"last_port": self.port_var.get(), "server_mode": self.mode_var.get(),
+                  "storage_mode": self.storage_mode, "warm_start_hours": self.warm_start_hours,
+                  "logger_config": self.logger_config_path}
         try:
             with open(GUI_CONFIG_FILE, 'w') as f:
                 json.dump(config, f)
@@ -115,6 +682,11 @@ class ServerGUI(tk.Tk):
         self.port_entry = ttk.Entry(top_frame, textvariable=self.port_var, width=10)
         self.port_entry.pack(side=tk.LEFT, padx=(0, 10))
 
+        ttk.Label(top_frame, text="Mode:").pack(side=tk.LEFT, padx=(0, 5))
+        self.mode_combo = ttk.Combobox(top_frame, textvariable=self.mode_var, values=("threaded", "asyncio", "multiprocess"),
+                                       state="readonly", width=12)
+        self.mode_combo.pack(side=tk.LEFT, padx=(0, 10))
+
         self.start_button = ttk.Button(top_frame, text="Start Server", command=self._start_server)
         self.start_button.pack(side=tk.LEFT, padx=(0, 5))
         self.stop_button = ttk.Button(top_frame, text="Stop Server", command=self._stop_server, state=tk.DISABLED)
@@ -145,6 +717,12 @@ class ServerGUI(tk.Tk):
         self.sensor_table.configure(yscroll=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.sensor_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.sensor_table.bind("<<TreeviewSelect>>", self._on_sensor_selection)
+
+        chart_frame = ttk.LabelFrame(self, text=f"Trend ({CHART_WINDOW_SECONDS // 60} min)", padding="5")
+        chart_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10)
+        self.chart = SensorChart(chart_frame, self.data_store, height=250)
+        self.chart.pack(fill=tk.BOTH, expand=True)
 
 
         self.status_bar = ttk.Label(self, text="Server stopped.", padding="5", relief=tk.SUNKEN, anchor=tk.W)
@@ -154,41 +732,166 @@ class ServerGUI(tk.Tk):
         self.status_bar.config(text=message, foreground=color)
 
     def _server_data_handler(self, data_dict):
-
-        self.message_queue.put(data_dict)
+        # Wywoływane w wątku serwera - w trybie asyncio w pętli zdarzeń, w multiprocess w agregatorze,
+        # więc nie może blokować: przy pełnej kolejce odczyty są porzucane i liczone.
+        try:
+            self.message_queue.put_nowait(data_dict)
+        except queue.Full:
+            self._dropped_readings += len(data_dict["payload"]) if data_dict.get("type") == "sensor_batch" else 1
 
     def _process_message_queue(self):
+        deadline = time.perf_counter() + INGEST_BUDGET_SECONDS
+        readings = []
+        records = None  # odczyty z ramek binarnych (RecordBlock) - bez parsowania ISO
         try:
-            while not self.message_queue.empty():
-                message = self.message_queue.get_nowait()
+            while time.perf_counter() < deadline:
+                try:
+                    message = self.message_queue.get_nowait()
+                except queue.Empty:
+                    break
 
                 if message["type"] == "sensor_data":
-                    payload = message["payload"]
-                    sensor_id = payload.get("sensor_id")
-                    timestamp_str = payload.get("timestamp")
-                    value = payload.get("value")
-                    unit = payload.get("unit")
-
-                    if all([sensor_id, timestamp_str, value is not None, unit]):
-                        try:
-                            timestamp_dt = datetime.fromisoformat(timestamp_str)
-                            self.data_store.add_reading(sensor_id, timestamp_dt, value, unit)
-
-                        except ValueError:
-                            print(f"GUI: Error parsing timestamp {timestamp_str}")
-                        except Exception as e:
-                            print(f"GUI: Error processing sensor data: {e}")
+                    self._parse_reading(message["payload"], readings)
+                elif message["type"] == "sensor_batch":
+                    if isinstance(message["payload"], protocol.RecordBlock):
+                        if records is None:
+                            records = protocol.RecordBlock()
+                        records.extend(message["payload"])
+                    else:
+                        for payload in message["payload"]:
+                            self._parse_reading(payload, readings)
                 elif message["type"] == "server_error":
                     self.update_status(f"SERVER ERROR: {message['message']}", "red")
                     self._server_stopped_ui_state()
                 elif message["type"] == "decode_error":
                     self.update_status(f"SERVER: {message['message']}", "orange")
+                elif message["type"] == "history_batch":
+                    for sensor_id, ticks_us, values, unit in message["payload"]:
+                        self.data_store.load_history(sensor_id, ticks_us, values, unit)
+                elif message["type"] == "warm_start_progress":
+                    self.update_status(message["message"], "blue")
+                elif message["type"] == "warm_start_done":
+                    self.update_status(message["message"], message.get("color", "black"))
+                    self.chart.redraw()
+        finally:
+            try:
+                if readings:
+                    self.data_store.add_readings(readings)
+                if records is not None:
+                    self.data_store.add_records(records)
+            except Exception as e:
+                print(f"GUI: Error processing sensor data: {e}")
+
+            if self._dropped_readings != self._reported_dropped_readings:
+                self._reported_dropped_readings = self._dropped_readings
+                self.update_status(f"GUI overloaded: {self._dropped_readings} readings dropped.", "orange")
+
+            # Zaległości w kolejce - kolejny takt szybciej, ale po oddaniu sterowania pętli Tk.
+            self.after(10 if not self.message_queue.empty() else 100, self._process_message_queue)
+
+    def _parse_reading(self, payload, readings):
+        if not isinstance(payload, dict):
+            print(f"GUI: Unexpected reading format: {payload}")
+            return
+
+        sensor_id = payload.get("sensor_id")
+        timestamp_str = payload.get("timestamp")
+        value = payload.get("value")
+        unit = payload.get("unit")
+
+        if all([sensor_id, timestamp_str, value is not None, unit]):
+            try:
+                readings.append((sensor_id, datetime.fromisoformat(timestamp_str), float(value), unit))
+            except (ValueError, TypeError):
+                print(f"GUI: Error parsing reading {timestamp_str} / {value}")
 
+    def _start_warm_start(self):
+        if np is None:
+            self.update_status("Warm start requires numpy. Skipping.", "orange")
+            return
+        self.update_status(f"Loading last {self.warm_start_hours} h of history from logs...", "blue")
+        threading.Thread(target=self._warm_start, name="WarmStart", daemon=True).start()
 
-        except queue.Empty:
-            pass
+    def _warm_start(self):
+        # Wątek w tle: logi czytane kolumnowo (read_logs_columnar - indeksy i katalog segmentów) po godzinie,
+        # żeby raportować postęp. Magazyn zmienia tylko wątek Tk - dane idą przez kolejkę wiadomości.
+        logger = None
+        try:
+            logger = Logger(self.logger_config_path)
+            end_dt = datetime.now()
+            start_dt = end_dt - timedelta(hours=self.warm_start_hours)
+            slices = max(1, math.ceil(self.warm_start_hours))
+            history = {}  # sensor_id -> ([tablice czasów µs], [tablice wartości], jednostka)
+            for index in range(slices):
+                slice_start = start_dt + timedelta(hours=index)
+                # Przedziały read_logs_columnar są domknięte - bez ostatniej mikrosekundy, poza ostatnim.
+                slice_end = min(start_dt + timedelta(hours=index + 1), end_dt)
+                if slice_end < end_dt:
+                    slice_end -= _MICROSECOND
+                columns = logger.read_logs_columnar(slice_start, slice_end, ordered=True)
+                self._split_history(columns, history)
+                self.message_queue.put({"type": "warm_start_progress",
+                                        "message": f"Loading history from logs: {index + 1}/{slices} h"})
+
+            sensor_ids = sorted(history)
+            total = 0
+            payload, payload_rows = [], 0
+            for sensor_id in sensor_ids:
+                ticks, values, unit = history.pop(sensor_id)
+                ticks, values = np.concatenate(ticks), np.concatenate(values)
+                total += len(values)
+                for lo, hi in self._history_chunks(ticks, WARM_START_ROWS_PER_MESSAGE - payload_rows):
+                    payload.append((sensor_id, ticks[lo:hi], values[lo:hi], unit))
+                    payload_rows += hi - lo
+                    if payload_rows >= WARM_START_ROWS_PER_MESSAGE:
+                        self.message_queue.put({"type": "history_batch", "payload": payload})
+                        payload, payload_rows = [], 0
+            if payload:
+                self.message_queue.put({"type": "history_batch", "payload": payload})
+            self.message_queue.put({"type": "warm_start_done", "color": "green",
+                                    "message": f"Loaded {total} readings of {len(sensor_ids)} sensors from logs."})
+        except Exception as e:
+            print(f"GUI: Warm start failed: {e}")
+            self.message_queue.put({"type": "warm_start_done", "color": "red", "message": f"Warm start failed: {e}"})
         finally:
-            self.after(100, self._process_message_queue)
+            if logger is not None:
+                logger.stop()  # zwalnia procesy skanu (scan_workers)
+
+    @staticmethod
+    def _history_chunks(ticks, first_size):
+        """
+        Zakresy (lo, hi) historii czujnika od najnowszych - load_history dokłada starsze odczyty przed
+        już wczytanymi. Pierwszy ma do first_size punktów (reszta miejsca w bieżącej wiadomości), kolejne
+        do WARM_START_ROWS_PER_MESSAGE; odczyty o tym samym czasie nie są rozdzielane między zakresy.
+        """
+        hi = len(ticks)
+        size = max(first_size, 1)
+        while hi > 0:
+            lo = max(hi - size, 0)
+            if lo:
+                lo = int(np.searchsorted(ticks, ticks[lo], 'left'))
+            yield lo, hi
+            hi = lo
+            size = WARM_START_ROWS_PER_MESSAGE
+
+    @staticmethod
+    def _split_history(columns, history):
+        """Kolumny read_logs_columnar (posortowane po czasie) -> tablice per czujnik, bez wartości nieliczbowych."""
+        codes = columns["sensor_code"]
+        order = np.argsort(codes, kind="stable")  # w obrębie czujnika zostaje kolejność czasu
+        bounds = np.searchsorted(codes[order], np.arange(len(columns["sensor_ids"]) + 1))
+        ticks = columns["timestamp"].astype(np.int64)[order]
+        values = columns["value"][order]
+        unit_codes = columns["unit_code"][order]
+        for code, sensor_id in enumerate(columns["sensor_ids"]):
+            lo, hi = int(bounds[code]), int(bounds[code + 1])
+            numeric = ~np.isnan(values[lo:hi])
+            if not numeric.any():
+                continue
+            entry = history.setdefault(sensor_id, ([], [], None))
+            entry[0].append(ticks[lo:hi][numeric])
+            entry[1].append(values[lo:hi][numeric])
+            history[sensor_id] = (entry[0], entry[1], columns["units"][unit_codes[hi - 1]])
 
     def _start_server(self):
         if self.server_instance and self.server_instance.running:
@@ -207,7 +910,9 @@ class ServerGUI(tk.Tk):
         self.update_status(f"Starting server on port {port}...", "blue")
 
 
-        self.server_instance = NetworkServer(port, data_callback=self._server_data_handler)
+        server_class = {"asyncio": AsyncNetworkServer,
+                        "multiprocess": MultiProcessNetworkServer}.get(self.mode_var.get(), NetworkServer)
+        self.server_instance = server_class(port, data_callback=self._server_data_handler, batch_callbacks=True)
 
         self.server_thread = threading.Thread(target=self.server_instance.start, daemon=True)
         self.server_thread.start()
@@ -222,6 +927,7 @@ class ServerGUI(tk.Tk):
             self.start_button.config(state=tk.DISABLED)
             self.stop_button.config(state=tk.NORMAL)
             self.port_entry.config(state=tk.DISABLED)
+            self.mode_combo.config(state=tk.DISABLED)
         elif self.server_instance:
             if "SERVER ERROR" not in self.status_bar.cget("text"):
                 self.update_status("Server failed to start. Check console.", "red")
@@ -251,19 +957,27 @@ class ServerGUI(tk.Tk):
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.port_entry.config(state=tk.NORMAL)
+        self.mode_combo.config(state="readonly")
 
     def _periodic_table_update(self):
+        started = time.perf_counter()
         self._update_sensor_table()
-        self.after(1200, self._periodic_table_update)
+        cost_ms = (time.perf_counter() - started) * 1000
+        # Kosztowne odświeżanie (wiele czujników) - rzadziej, żeby nie blokować pętli Tk.
+        interval = min(max(TABLE_REFRESH_INTERVAL_MS, int(cost_ms / TABLE_REFRESH_LOAD)), TABLE_REFRESH_MAX_INTERVAL_MS)
+        self.after(interval, self._periodic_table_update)
 
-    def _update_sensor_table(self):
-        for item in self.sensor_table.get_children():
-            self.sensor_table.delete(item)
+    def _on_sensor_selection(self, event=None):
+        self.chart.set_sensors(sorted(self.sensor_table.set(item, "sensor_id")
+                                      for item in self.sensor_table.selection()))
 
-        sensor_ids = self.data_store.get_all_sensor_ids()
-        sensor_ids.sort()
+    def _periodic_chart_update(self):
+        self.chart.refresh()
+        self.after(CHART_REFRESH_MS, self._periodic_chart_update)
 
-        for sensor_id in sensor_ids:
+    def _update_sensor_table(self):
+        # Wiersze aktualizowane tylko, gdy zmieniły się wyświetlane wartości - bez usuwania całej tabeli.
+        for sensor_id in self.data_store.get_all_sensor_ids():
             last_reading = self.data_store.get_last_reading(sensor_id)
             if not last_reading:
                 continue
@@ -271,14 +985,24 @@ class ServerGUI(tk.Tk):
             avg_1h = self.data_store.calculate_average(sensor_id, 3600)
             avg_12h = self.data_store.calculate_average(sensor_id, 12 * 3600)
 
-            self.sensor_table.insert("", tk.END, values=(
+            values = (
                 sensor_id,
                 f"{last_reading['value']:.2f}" if isinstance(last_reading['value'], float) else last_reading['value'],
                 last_reading['unit'],
                 last_reading['timestamp'].strftime("%Y-%m-%d %H:%M:%S"),
                 f"{avg_1h:.2f}" if avg_1h is not None else "N/A",
                 f"{avg_12h:.2f}" if avg_12h is not None else "N/A"
-            ))
+            )
+
+            row = self._table_rows.get(sensor_id)
+            if row is None:
+                index = bisect.bisect_left(self._table_order, sensor_id)
+                self._table_order.insert(index, sensor_id)
+                item = self.sensor_table.insert("", index, values=values)
+                self._table_rows[sensor_id] = (item, values)
+            elif row[1] != values:
+                self.sensor_table.item(row[0], values=values)
+                self._table_rows[sensor_id] = (row[0], values)
 
     def _on_closing(self):
         if self.server_instance and self.server_instance.running:
@@ -1,11 +1,280 @@
+import bisect
 import csv
+import heapq
+import io
+import itertools
 import json
+import multiprocessing
 import os
+import queue
 import shutil
+import threading
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Optional, Iterator, Dict
 
+from rollups import RollupStore, merge_stats, summarize
+
+try:
+    import numpy as np
+    import columnar
+except ImportError:  # numpy potrzebny tylko dla read_logs_columnar i segmentów kolumnowych
+    np = None
+    columnar = None
+
+WRITE_BEHIND_MAX_BATCH = 5000  # maks. wierszy jednego zapisu - między zapisami sprawdzana jest rotacja
+CATALOG_FILENAME = "catalog.json"
+COLUMNAR_SUFFIX = ".col"  # segmenty archiwum w formacie kolumnowym (columnar.py)
+INDEX_SUFFIX = ".idx"  # rzadki indeks segmentu: linie "timestamp,offset w bajtach"; tylko dla segmentów uporządkowanych
+COLUMNAR_BLOCK_BYTES = 1024 * 1024  # porcja segmentu parsowana naraz przez read_logs_columnar
+
+
+def _update_stats(stats: dict, rows) -> None:
+    """Aktualizuje zakres czasu (napisy ISO - porównywane leksykograficznie), liczbę wierszy i czujniki."""
+    if not rows:
+        return
+    timestamps = [row[0] for row in rows]
+    low, high = min(timestamps), max(timestamps)
+    # Czy wiersze segmentu są uporządkowane czasowo (wtedy read_logs(ordered=True) czyta je strumieniowo).
+    if stats.get("sorted", True):
+        stats["sorted"] = ((stats["max_timestamp"] is None or timestamps[0] >= stats["max_timestamp"]) and
+                           all(a <= b for a, b in zip(timestamps, timestamps[1:])))
+    if stats["min_timestamp"] is None or low < stats["min_timestamp"]:
+        stats["min_timestamp"] = low
+    if stats["max_timestamp"] is None or high > stats["max_timestamp"]:
+        stats["max_timestamp"] = high
+    stats["rows"] += len(rows)
+    stats["sensors"].update(row[1] for row in rows)
+
+
+def _csv_text(rows) -> str:
+    chunk = io.StringIO()
+    csv.writer(chunk).writerows(rows)
+    return chunk.getvalue()
+
+
+def _parse_index(text: str):
+    """Indeks segmentu -> (lista timestampów ISO, lista offsetów) do wyszukiwania binarnego."""
+    timestamps, offsets = [], []
+    for line in text.splitlines():
+        ts, _, offset = line.rpartition(',')
+        try:
+            offsets.append(int(offset))
+        except ValueError:
+            continue
+        timestamps.append(ts)
+    return timestamps, offsets
+
+
+def _scan_stats(text_file) -> dict:
+    """Statystyki segmentu CSV odczytane z pliku (dla segmentów bez statystyk z zapisu)."""
+    stats = {"min_timestamp": None, "max_timestamp": None, "rows": 0, "sensors": set(), "sorted": True}
+    reader = csv.reader(text_file)
+    next(reader, None)  # nagłówek
+    chunk = []
+    for row in reader:
+        if len(row) >= 2 and row[0]:
+            chunk.append(row)
+            if len(chunk) >= 10000:
+                _update_stats(stats, chunk)
+                chunk = []
+    _update_stats(stats, chunk)
+    return stats
+
+
+def _merge_segments(segments) -> Iterator[Dict]:
+    """
+    Scalanie k-drogowe wierszy segmentów po "timestamp". segments: (początek segmentu lub None,
+    czy wiersze są uporządkowane, iterator wierszy). Segmenty ze znanym początkiem są otwierane
+    dopiero, gdy najmniejszy czekający wiersz go osiągnie - nakładające się segmenty są czytane
+    równolegle, rozłączne po kolei.
+    """
+    def rows_of(is_sorted, rows):
+        return rows if is_sorted else iter(sorted(rows, key=lambda row: row["timestamp"]))
+
+    heap = []
+    counter = 0  # rozstrzyga remisy bez porównywania słowników
+
+    def push_next(rows):
+        nonlocal counter
+        for row in rows:
+            heapq.heappush(heap, (row["timestamp"], counter, row, rows))
+            counter += 1
+            return
+
+    waiting = sorted((s for s in segments if s[0] is not None), key=lambda s: s[0], reverse=True)
+    for segment_start, is_sorted, rows in segments:
+        if segment_start is None:
+            push_next(rows_of(is_sorted, rows))
+
+    while heap or waiting:
+        # Otwórz segmenty, które mogą zawierać wiersze wcześniejsze niż najmniejszy czekający.
+        while waiting and (not heap or waiting[-1][0] <= heap[0][0]):
+            _, is_sorted, rows = waiting.pop()
+            push_next(rows_of(is_sorted, rows))
+        if not heap:
+            continue
+        _, _, row, rows = heapq.heappop(heap)
+        yield row
+        push_next(rows)
+
+
+def _read_header(raw) -> Optional[list]:
+    """Nagłówek segmentu otwartego binarnie; None, jeśli brakuje którejś z wymaganych kolumn."""
+    header_line = raw.readline().decode('utf-8')
+    expected_headers = ["timestamp", "sensor_id", "value", "unit"]
+    actual_headers = [h.strip() for h in next(csv.reader([header_line]), [])]
+    if not all(eh in actual_headers for eh in expected_headers):
+        return None
+    return actual_headers
+
+
+def _seek_index(raw, index, start_dt: datetime) -> None:
+    """Skok do ostatniego wpisu indeksu przed start_dt (bez indeksu - czytanie od nagłówka)."""
+    if index:
+        timestamps, offsets = index
+        position = bisect.bisect_left(timestamps, start_dt.isoformat())
+        if position > 0:
+            raw.seek(offsets[position - 1])
+
+
+def _to_datetime64(strings):
+    """Napisy ISO -> datetime64[us] w jednym wywołaniu; napisy nieparsowalne -> NaT."""
+    try:
+        return np.array(strings, dtype='datetime64[us]')
+    except ValueError:
+        pass
+    parsed = []
+    for ts_str in strings:
+        try:
+            parsed.append(np.datetime64(ts_str, 'us'))
+        except ValueError:
+            try:
+                parsed.append(np.datetime64(datetime.strptime(ts_str.split('.')[0], '%Y-%m-%dT%H:%M:%S'), 'us'))
+            except ValueError:
+                parsed.append(np.datetime64('NaT', 'us'))
+    return np.array(parsed, dtype='datetime64[us]')
+
+
+def _to_float64(strings):
+    """Napisy -> float64 w jednym wywołaniu; wartości nieliczbowe -> NaN."""
+    try:
+        return np.array(strings, dtype=np.float64)
+    except ValueError:
+        pass
+    parsed = []
+    for value in strings:
+        try:
+            parsed.append(float(value))
+        except ValueError:
+            parsed.append(np.nan)
+    return np.array(parsed, dtype=np.float64)
+
+
+def _csv_columns(text: str, positions: list, width: int):
+    """
+    Blok wierszy CSV -> (timestamp, value, sensor_id, unit) jako tablice NumPy albo None dla pustego bloku.
+    Blok bez cudzysłowów i z pełnymi wierszami dzielony jest jednym str.split (csv.reader tylko,
+    gdy blok tego wymaga); wiersze o złej liczbie pól lub bez poprawnego znacznika czasu są pomijane.
+    """
+    text = text.replace('\r\n', '\n').rstrip('\n')
+    if not text:
+        return None
+    fields = text.replace('\n', ',').split(',') if '"' not in text else []
+    if len(fields) == (text.count('\n') + 1) * width:
+        # Każdy wiersz ma width pól - kolumny to co width-te pole jednego podziału całego bloku.
+        columns = [fields[position::width] for position in range(width)]
+    else:
+        rows = [row for row in csv.reader(io.StringIO(text)) if len(row) == width]
+        if not rows:
+            return None
+        columns = list(zip(*rows))
+    timestamps = _to_datetime64(columns[positions[0]])
+    sensors = np.array(columns[positions[1]])
+    values = _to_float64(columns[positions[2]])
+    units = np.array(columns[positions[3]])
+
+    valid = ~np.isnat(timestamps)
+    if not valid.all():
+        if not valid.any():
+            return None
+        timestamps, values, sensors, units = timestamps[valid], values[valid], sensors[valid], units[valid]
+    return timestamps, values, sensors, units
+
+
+def _category_codes(strings, categories: dict):
+    """Kody kategorii dla tablicy napisów; categories (napis -> kod) jest uzupełniany o nowe napisy."""
+    uniques, inverse = np.unique(strings, return_inverse=True)
+    mapping = np.array([categories.setdefault(text, len(categories)) for text in uniques.tolist()], dtype=np.int32)
+    return mapping[inverse.reshape(-1)]
+
+
+def _aggregate_columns(groups: dict, values, sensors) -> None:
+    """Dołącza do groups (sensor_id -> [count, sum, min, max, sum_sq]) blok kolumn; NaN są pomijane."""
+    finite = ~np.isnan(values)
+    values, sensors = values[finite], sensors[finite]
+    if not len(values):
+        return
+    names, codes = np.unique(sensors, return_inverse=True)
+    codes = codes.reshape(-1)
+    counts = np.bincount(codes, minlength=len(names))
+    sums = np.bincount(codes, weights=values, minlength=len(names))
+    sums_sq = np.bincount(codes, weights=values * values, minlength=len(names))
+    mins = np.full(len(names), np.inf)
+    maxs = np.full(len(names), -np.inf)
+    np.minimum.at(mins, codes, values)
+    np.maximum.at(maxs, codes, values)
+    for position, name in enumerate(names.tolist()):
+        stats = [int(counts[position]), float(sums[position]), float(mins[position]), float(maxs[position]),
+                 float(sums_sq[position])]
+        if name in groups:
+            merge_stats(groups[name], stats)
+        else:
+            groups[name] = stats
+
+
+def _scan_segment(read_file, filepath: str, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str],
+                  is_sorted: bool, mode: str):
+    """
+    Skan jednego segmentu - w procesie roboczym, gdy scan_workers > 1. Wynik zależy od mode:
+      "rows"      - kolumny (timestamp, sensor_id, value, unit) wierszy z read_file (te same wartości co
+                    w skanie sekwencyjnym) w kolejności czasu; z numpy timestamp jako datetime64 - obiekty
+                    datetime są najdroższe w przesyłaniu między procesami,
+      "columns"   - bloki kolumn NumPy jak z _read_segment_columns,
+      "aggregate" - {sensor_id: [count, sum, min, max, sum_sq]} dla wartości liczbowych.
+    """
+    if mode == "columns":
+        return list(read_file(filepath, start_dt, end_dt, sensor_id, is_sorted, columnar_blocks=True))
+    if mode == "aggregate":
+        groups = {}
+        if np is not None:
+            for _, values, sensors, _ in read_file(filepath, start_dt, end_dt, sensor_id, is_sorted,
+                                                   columnar_blocks=True):
+                _aggregate_columns(groups, values, sensors)
+            return groups
+        for row in read_file(filepath, start_dt, end_dt, sensor_id, is_sorted):
+            value = row["value"]
+            if not isinstance(value, float) or value != value:
+                continue
+            if row["sensor_id"] in groups:
+                merge_stats(groups[row["sensor_id"]], [1, value, value, value, value * value])
+            else:
+                groups[row["sensor_id"]] = [1, value, value, value, value * value]
+        return groups
+
+    rows = [(row["timestamp"], row["sensor_id"], row["value"], row["unit"])
+            for row in read_file(filepath, start_dt, end_dt, sensor_id, is_sorted)]
+    if not is_sorted:
+        rows.sort(key=lambda row: row[0])
+    columns = [list(column) for column in zip(*rows)] or [[], [], [], []]
+    if np is not None:
+        columns[0] = np.array(columns[0], dtype='datetime64[us]')
+    return columns
+
+
 class Logger:
     def __init__(self, config_path: str):
         try:
@@ -25,6 +294,29 @@ class Logger:
         self.max_size_mb = config.get("max_size_mb")
         self.rotate_after_lines = config.get("rotate_after_lines")
         self.retention_days = config.get("retention_days")
+        # Tryb write-behind: log_reading tylko kolejkuje, zapis robi osobny wątek
+        # (zbiorczo - po buffer_size odczytach albo co flush_interval sekund).
+        self.write_behind = config.get("write_behind", False)
+        self.queue_size = config.get("queue_size", 10000)
+        self.flush_interval = config.get("flush_interval", 1.0)
+        # Co ile wierszy zapisywać (timestamp, offset) w indeksie segmentu; 0 = bez indeksu.
+        self.index_every_rows = config.get("index_every_rows", 1000)
+        # Format archiwum: "csv" - segmenty CSV w ZIP, "columnar" - segmenty kolumnowe .col (columnar.py).
+        # Bieżący segment jest zawsze plikiem CSV; format dotyczy segmentów po rotacji.
+        self.storage = config.get("storage", "csv")
+        if self.storage not in ("csv", "columnar"):
+            print(f"BŁĄD Loggera: Nieznany format archiwum '{self.storage}'. Używam 'csv'.")
+            self.storage = "csv"
+        if self.storage == "columnar" and columnar is None:
+            print("BŁĄD Loggera: Format 'columnar' wymaga pakietu numpy. Używam 'csv'.")
+            self.storage = "csv"
+        # Agregaty 1m / 1h / 1d (rollups.py) liczone przy zapisie; każdy poziom ma własną retencję.
+        self.rollups = config.get("rollups", False)
+        self.rollup_retention_days = config.get("rollup_retention_days")
+        self.rollup_flush_interval = config.get("rollup_flush_interval", 10.0)
+        # Równoległy skan segmentów w read_logs / read_logs_columnar / aggregate_logs: liczba procesów
+        # roboczych; 0 lub 1 - skan w bieżącym procesie.
+        self.scan_workers = config.get("scan_workers", 0) or 0
 
         self.archive_dir = os.path.join(self.log_dir, "archive")
         try:
@@ -37,11 +329,42 @@ class Logger:
         self._buffer = []
         self._current_file_path = None
         self._file_handle = None
+        self._index_handle = None
         self._file_creation_time = None
         self._file_line_count = 0
+        self._file_bytes = 0  # rozmiar bieżącego pliku liczony przy zapisie - bez os.path.getsize
+        self._segment_stats = None  # zakres czasu / czujniki bieżącego pliku; None = nieznane
         self.is_active = False
         self._last_closed_file_path = None
 
+        self._queue = deque()  # (timestamp, sensor_id, value, unit) czekające na wątek zapisu
+        self._lock = threading.RLock()  # plik i _buffer w trybie write-behind
+        self._wake = threading.Event()
+        self._writer_thread = None
+        self._writer_running = False
+        self.dropped_records = 0
+
+        # Kompresja zamkniętych segmentów i usuwanie starych archiwów w tle.
+        self._archive_queue = queue.Queue()
+        self._archiver_thread = None
+
+        # Katalog archiwów: dla każdego ZIP zakres czasu, liczba wierszy i czujniki - read_logs
+        # otwiera tylko archiwa, które mogą zawierać szukane odczyty.
+        self._catalog_path = os.path.join(self.archive_dir, CATALOG_FILENAME)
+        self._catalog_lock = threading.Lock()
+        self._catalog = self._load_catalog()
+
+        self._scan_executor = None
+        self._scan_lock = threading.Lock()
+
+        self._rollups = None
+        if self.rollups:
+            try:
+                self._rollups = RollupStore(os.path.join(self.log_dir, "rollups"), self.rollup_retention_days,
+                                            self.rollup_flush_interval)
+            except OSError as e:
+                print(f"BŁĄD Loggera: Nie można utworzyć katalogu agregatów: {e}")
+
     def _get_new_filepath(self) -> str:
         return os.path.join(self.log_dir, datetime.now().strftime(self.filename_pattern))
 
@@ -49,54 +372,176 @@ class Logger:
         if self.is_active:
             return
 
+        if not self._open_file():
+            return
+        self.is_active = True
+
+        self._schedule_leftover_segments()
+        self._schedule_archive_job(self._backfill_catalog)
+        if self.write_behind:
+            self._writer_running = True
+            self._writer_thread = threading.Thread(target=self._writer_loop, name="LoggerWriter", daemon=True)
+            self._writer_thread.start()
+
+    def stop(self) -> None:
+        if not self.is_active:
+            # Logger używany tylko do odczytu (bez start()) też mógł uruchomić procesy skanu.
+            self._shutdown_scan_executor()
+            return
+        if self._writer_thread:
+            # Wątek zapisu przed zakończeniem zapisuje wszystko, co zostało w kolejce - Logger jest
+            # jeszcze aktywny, więc rotacja działa dla tych odczytów jak zwykle.
+            self._writer_running = False
+            self._wake.set()
+            self._writer_thread.join()
+            self._writer_thread = None
+
+        with self._lock:
+            self.is_active = False  # od teraz log_reading nic nie przyjmuje
+            self._drain_queue()  # odczyty dodane równolegle ze stop()
+            self._flush_buffer()
+            self._close_file()
+            if self._rollups:
+                self._rollups.flush()
+
+        if self._archiver_thread:
+            self._archive_queue.put(None)
+            self._archiver_thread.join()
+            self._archiver_thread = None
+        self._shutdown_scan_executor()
+
+    def _open_file(self) -> bool:
         self._current_file_path = self._get_new_filepath()
         file_exists = os.path.exists(self._current_file_path)
-        
+
         try:
             self._file_handle = open(self._current_file_path, 'a+', newline='', encoding='utf-8')
             self._file_creation_time = datetime.now()
             self._file_line_count = 0
+            # Dopisywanie do istniejącego pliku - statystyki segmentu zostaną policzone przy archiwizacji,
+            # a indeksu z poprzedniego uruchomienia nie da się zweryfikować.
+            self._segment_stats = None
+            if os.path.exists(self._current_file_path + INDEX_SUFFIX):
+                os.remove(self._current_file_path + INDEX_SUFFIX)
             if not file_exists or os.path.getsize(self._current_file_path) == 0:
                 writer = csv.writer(self._file_handle)
                 writer.writerow(["timestamp", "sensor_id", "value", "unit"])
                 self._file_handle.flush()
+                self._segment_stats = {"min_timestamp": None, "max_timestamp": None, "rows": 0, "sensors": set(),
+                                       "sorted": True}
+                if self.index_every_rows:
+                    # Indeks tylko dla nowych segmentów - offsety dopisanych wcześniej wierszy nie są znane.
+                    self._index_handle = open(self._current_file_path + INDEX_SUFFIX, 'w', encoding='utf-8')
+            self._file_bytes = os.path.getsize(self._current_file_path)
 
         except IOError as e:
             print(f"BŁĄD Loggera: Nie można otworzyć pliku logu '{self._current_file_path}': {e}")
             self._current_file_path = None
             self._file_handle = None
-            return
-            
-        self.is_active = True
+            return False
+        return True
 
-    def stop(self) -> None:
-        if not self.is_active:
-            return
-            
-        self._flush_buffer()
+    def _close_file(self) -> None:
+        if self._index_handle:
+            try:
+                self._index_handle.close()
+            except IOError:
+                pass
+            self._index_handle = None
         if self._file_handle:
             try:
                 self._last_closed_file_path = self._current_file_path
                 self._file_handle.close()
             except IOError:
                 pass
-        
         self._file_handle = None
-        self.is_active = False
 
     def _flush_buffer(self) -> None:
         if not self._file_handle or self._file_handle.closed:
             return
         if self._buffer:
             try:
-                writer = csv.writer(self._file_handle)
-                writer.writerows(self._buffer)
+                data, nbytes, index_entries = self._serialize_rows(self._buffer)
+                self._file_handle.write(data)
                 self._file_handle.flush() 
+                if index_entries:
+                    self._index_handle.write(''.join(f"{ts},{offset}\n" for ts, offset in index_entries))
+                    self._index_handle.flush()
+                self._file_bytes += nbytes
                 self._file_line_count += len(self._buffer)
+                if self._segment_stats is not None:
+                    _update_stats(self._segment_stats, self._buffer)
+                    if self._index_handle and not self._segment_stats["sorted"]:
+                        self._drop_index()
+                if self._rollups:
+                    self._rollups.add(self._buffer)  # zapis agregatów robi wątek archiwizacji
                 self._buffer.clear()
             except IOError:
                 pass
 
+    def _drop_index(self) -> None:
+        """Segment przestał być uporządkowany - indeks istnieje tylko dla segmentów uporządkowanych."""
+        index_path = self._index_handle.name
+        try:
+            self._index_handle.close()
+            os.remove(index_path)
+        except OSError:
+            pass
+        self._index_handle = None
+
+    def _serialize_rows(self, rows):
+        """
+        Zwraca (tekst CSV, liczba bajtów, wpisy indeksu). Wpis indeksu (timestamp, offset) trafia
+        na co index_every_rows-ty wiersz segmentu; offset liczony od zapisanych bajtów.
+        """
+        if not self._index_handle:
+            data = _csv_text(rows)
+            return data, len(data.encode('utf-8')), []
+
+        every = self.index_every_rows
+        pieces, entries = [], []
+        offset = self._file_bytes
+        start = 0
+        for position in range(-self._file_line_count % every, len(rows), every):
+            if position > start:
+                piece = _csv_text(rows[start:position])
+                pieces.append(piece)
+                offset += len(piece.encode('utf-8'))
+            entries.append((rows[position][0], offset))
+            start = position
+        piece = _csv_text(rows[start:])
+        pieces.append(piece)
+        offset += len(piece.encode('utf-8'))
+        return ''.join(pieces), offset - self._file_bytes, entries
+
+    def _flush_pending(self) -> None:
+        """Zapisuje wszystko, co czeka w buforze (i w kolejce trybu write-behind)."""
+        with self._lock:
+            self._drain_queue()
+            self._flush_buffer()
+
+    def _drain_queue(self, limit: Optional[int] = None) -> None:
+        # Tylko tyle, ile było w kolejce na początku - nowe odczyty trafią do kolejnej porcji.
+        pending = self._queue
+        count = len(pending) if limit is None else min(limit, len(pending))
+        for _ in range(count):
+            timestamp, sensor_id, value, unit = pending.popleft()
+            self._buffer.append([timestamp.isoformat(), sensor_id, value, unit])
+
+    def _writer_loop(self) -> None:
+        while self._writer_running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_queued()
+        self._write_queued()  # odczyty dodane w trakcie ostatniej porcji
+
+    def _write_queued(self) -> None:
+        with self._lock:
+            for _ in range(0, len(self._queue), WRITE_BEHIND_MAX_BATCH):
+                self._drain_queue(WRITE_BEHIND_MAX_BATCH)
+                self._flush_buffer()  # jeden zapis i jeden flush na całą porcję
+                self._check_rotation()
+
     def log_reading(
         self,
         sensor_id: str,
@@ -108,7 +553,20 @@ class Logger:
         if sensor_id == "network":
             return
 
-        if not self.is_active or not self._file_handle:
+        if not self.is_active:
+            return
+
+        if self.write_behind:
+            # Bez sprawdzania _file_handle - w trakcie rotacji wątek zapisu chwilowo nie ma otwartego pliku.
+            if len(self._queue) >= self.queue_size:
+                self.dropped_records += 1
+                return
+            self._queue.append((timestamp, sensor_id, value, unit))
+            if len(self._queue) >= self.buffer_size and not self._wake.is_set():
+                self._wake.set()
+            return
+
+        if not self._file_handle:
             return
 
         formatted_timestamp = timestamp.isoformat()
@@ -130,13 +588,9 @@ class Logger:
                 perform_rotation = True
         
         if not perform_rotation and self.max_size_mb:
-            try:
-                self._flush_buffer()
-                if self._file_handle and not self._file_handle.closed:
-                     if os.path.getsize(self._current_file_path) >= self.max_size_mb * 1024 * 1024:
-                        perform_rotation = True
-            except OSError: 
-                pass
+            # Liczone od zapisanych bajtów - wiersze w buforze wejdą do następnego segmentu.
+            if self._file_bytes >= self.max_size_mb * 1024 * 1024:
+                perform_rotation = True
 
         if not perform_rotation and self.rotate_after_lines:
             if self._file_line_count >= self.rotate_after_lines:
@@ -146,26 +600,247 @@ class Logger:
             self._rotate()
 
     def _rotate(self) -> None:
+        """
+        Zamyka bieżący plik, przenosi go do archive/ i od razu otwiera nowy segment.
+        Kompresja ZIP i czyszczenie starych archiwów odbywają się w wątku w tle.
+        """
         old_file_path_for_archive = self._current_file_path
-        self.stop() 
+        self._flush_buffer()
+        self._close_file()
 
         if old_file_path_for_archive and os.path.exists(old_file_path_for_archive):
             archive_filename_original = os.path.basename(old_file_path_for_archive)
             archive_base, archive_ext = os.path.splitext(archive_filename_original)
-            
+
             timestamp_str = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            zip_filename = f"{archive_base}_{timestamp_str}{archive_ext}.zip"
-            zip_filepath = os.path.join(self.archive_dir, zip_filename)
+            segment_path = os.path.join(self.archive_dir, f"{archive_base}_{timestamp_str}{archive_ext}")
+            try:
+                os.replace(old_file_path_for_archive, segment_path)
+                if os.path.exists(old_file_path_for_archive + INDEX_SUFFIX):
+                    os.replace(old_file_path_for_archive + INDEX_SUFFIX, segment_path + INDEX_SUFFIX)
+                self._schedule_archive_job(self._archive_segment, segment_path, archive_filename_original,
+                                           self._segment_stats)
+            except OSError as e:
+                print(f"BŁĄD Loggera: Nie można przenieść pliku '{old_file_path_for_archive}' do archiwum: {e}")
+
+        self._open_file()
+
+    def _schedule_archive_job(self, job, *args) -> None:
+        if self._archiver_thread is None or not self._archiver_thread.is_alive():
+            self._archiver_thread = threading.Thread(target=self._archiver_loop, name="LoggerArchiver", daemon=True)
+            self._archiver_thread.start()
+        self._archive_queue.put((job, args))
 
+    def _schedule_leftover_segments(self) -> None:
+        """Segmenty przeniesione do archive/, których kompresja nie zdążyła się zakończyć."""
+        try:
+            for filename in sorted(os.listdir(self.archive_dir)):
+                if filename.endswith(".csv"):
+                    self._schedule_archive_job(self._archive_segment, os.path.join(self.archive_dir, filename),
+                                               filename, None)
+        except OSError:
+            pass
+
+    def _archiver_loop(self) -> None:
+        # Wątek archiwizacji zapisuje też agregaty co rollup_flush_interval - nie wątek czujnika ani zapisu.
+        timeout = max(self._rollups.flush_interval, 0.1) if self._rollups else None
+        while True:
             try:
-                with zipfile.ZipFile(zip_filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
-                    zf.write(old_file_path_for_archive, archive_filename_original)
-                os.remove(old_file_path_for_archive) 
-            except (IOError, OSError, zipfile.BadZipFile):
-                pass
-        
-        self._clean_old_archives()
-        self.start()
+                item = self._archive_queue.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    self._rollups.flush_if_due()
+                except Exception as e:
+                    print(f"BŁĄD Loggera: Nie można zapisać agregatów: {e}")
+                continue
+            if item is None:
+                break
+            job, args = item
+            try:
+                job(*args)
+                self._clean_old_archives()
+                if self._rollups:
+                    self._rollups.flush_if_due()
+                    self._rollups.clean_old()
+            except Exception as e:
+                # Błąd jednego zadania nie może zatrzymać archiwizacji kolejnych segmentów.
+                print(f"BŁĄD Loggera: Zadanie archiwizacji {getattr(job, '__name__', job)}{args} nie powiodło się: {e}")
+
+    def _archive_segment(self, segment_path: str, archive_name: str, stats: Optional[dict]) -> None:
+        if self.storage == "columnar":
+            self._columnarize_segment(segment_path, archive_name, stats)
+        else:
+            self._compress_segment(segment_path, archive_name, stats)
+
+    def _compress_segment(self, segment_path: str, archive_name: str, stats: Optional[dict]) -> None:
+        zip_filepath = segment_path + ".zip"
+        tmp_filepath = zip_filepath + ".tmp"
+        try:
+            if stats is None:
+                with open(segment_path, 'r', newline='', encoding='utf-8') as f:
+                    stats = _scan_stats(f)
+            index_path = segment_path + INDEX_SUFFIX
+            with zipfile.ZipFile(tmp_filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.write(segment_path, archive_name)  # dane zawsze jako pierwszy plik archiwum
+                if os.path.exists(index_path):
+                    zf.write(index_path, archive_name + INDEX_SUFFIX)
+            os.replace(tmp_filepath, zip_filepath)
+            self._set_catalog_entry(os.path.basename(zip_filepath), stats)
+            os.remove(segment_path)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+        except (IOError, OSError, zipfile.BadZipFile) as e:
+            print(f"BŁĄD Loggera: Nie można skompresować pliku '{segment_path}': {e}")
+
+    def _columnarize_segment(self, segment_path: str, archive_name: str, stats: Optional[dict] = None) -> None:
+        """Zamienia zamknięty segment CSV na segment kolumnowy (zamiast kompresji ZIP)."""
+        col_filepath = os.path.splitext(segment_path)[0] + COLUMNAR_SUFFIX
+        try:
+            with open(segment_path, 'rb') as raw:
+                self._write_columnar(raw, col_filepath, archive_name)
+            os.remove(segment_path)
+            if os.path.exists(segment_path + INDEX_SUFFIX):
+                os.remove(segment_path + INDEX_SUFFIX)
+        except (IOError, OSError, ValueError, UnicodeDecodeError) as e:
+            print(f"BŁĄD Loggera: Nie można zapisać segmentu kolumnowego '{col_filepath}': {e}")
+
+    def _write_columnar(self, raw, col_filepath: str, archive_name: str) -> None:
+        """Segment CSV (otwarty binarnie) -> plik .col zapisany atomowo i wpisany do katalogu."""
+        blocks = list(self._read_segment_columns(raw, datetime.min, datetime.max, None))
+        if blocks:
+            timestamps, values, sensors, units = (np.concatenate(column) for column in zip(*blocks))
+        else:
+            timestamps, values, sensors, units = (np.empty(0, dtype='datetime64[us]'), np.empty(0), [], [])
+        tmp_filepath = col_filepath + ".tmp"
+        stats = columnar.write_segment(tmp_filepath, timestamps, values, sensors, units, source=archive_name)
+        os.replace(tmp_filepath, col_filepath)
+        self._set_catalog_entry(os.path.basename(col_filepath), stats)
+
+    def convert_archives(self, remove_source: bool = True) -> int:
+        """
+        Konwertuje istniejące archiwa ZIP (i segmenty CSV czekające w archive/) na segmenty kolumnowe.
+        Zwraca liczbę skonwertowanych plików. Nie należy jej wywoływać, gdy inny Logger pisze do tego katalogu.
+        """
+        if columnar is None:
+            raise ImportError("convert_archives wymaga pakietu numpy")
+        converted = 0
+        for filename in sorted(os.listdir(self.archive_dir)):
+            filepath = os.path.join(self.archive_dir, filename)
+            if filename.endswith(".zip"):
+                col_filepath = filepath[:-len(".zip")]
+            elif filename.endswith(".csv"):
+                col_filepath = filepath
+            else:
+                continue
+            col_filepath = os.path.splitext(col_filepath)[0] + COLUMNAR_SUFFIX
+            try:
+                if filename.endswith(".zip"):
+                    with zipfile.ZipFile(filepath, 'r') as zf:
+                        if not zf.namelist():
+                            continue
+                        archive_name = zf.namelist()[0]
+                        with zf.open(archive_name) as raw:
+                            self._write_columnar(raw, col_filepath, archive_name)
+                    if remove_source:
+                        os.remove(filepath)
+                        self._remove_catalog_entry(filename)
+                else:
+                    with open(filepath, 'rb') as raw:
+                        self._write_columnar(raw, col_filepath, filename)
+                    if remove_source:
+                        os.remove(filepath)
+                        if os.path.exists(filepath + INDEX_SUFFIX):
+                            os.remove(filepath + INDEX_SUFFIX)
+                converted += 1
+            except (OSError, ValueError, UnicodeDecodeError, zipfile.BadZipFile) as e:
+                print(f"BŁĄD Loggera: Nie można skonwertować archiwum '{filepath}': {e}")
+        return converted
+
+    # --- Katalog archiwów ---
+
+    def _load_catalog(self) -> dict:
+        try:
+            with open(self._catalog_path, 'r', encoding='utf-8') as f:
+                segments = json.load(f).get("segments", {})
+            return {name: entry for name, entry in segments.items() if isinstance(entry, dict)}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_catalog(self) -> None:
+        # Wywoływane pod _catalog_lock; zapis atomowy, jak punkt kontrolny bufora klienta.
+        tmp_path = self._catalog_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"segments": self._catalog}, f)
+            os.replace(tmp_path, self._catalog_path)
+        except OSError as e:
+            print(f"BŁĄD Loggera: Nie można zapisać katalogu archiwów '{self._catalog_path}': {e}")
+
+    def _set_catalog_entry(self, zip_filename: str, stats: dict) -> None:
+        entry = {
+            "min_timestamp": stats["min_timestamp"],
+            "max_timestamp": stats["max_timestamp"],
+            "rows": stats["rows"],
+            "sensors": sorted(stats["sensors"]),
+            "sorted": stats.get("sorted", False),
+        }
+        with self._catalog_lock:
+            self._catalog[zip_filename] = entry
+            self._save_catalog()
+
+    def _remove_catalog_entry(self, zip_filename: str) -> None:
+        with self._catalog_lock:
+            if self._catalog.pop(zip_filename, None) is not None:
+                self._save_catalog()
+
+    def _backfill_catalog(self) -> None:
+        """Dopisuje do katalogu archiwa utworzone wcześniej bez niego (jednorazowy odczyt każdego, .col - ze stopki)."""
+        try:
+            filenames = sorted(f for f in os.listdir(self.archive_dir) if f.endswith(".zip"))
+        except OSError:
+            return
+        if columnar is not None:
+            filenames += sorted(f for f in os.listdir(self.archive_dir) if f.endswith(COLUMNAR_SUFFIX))
+        for filename in filenames:
+            if filename in self._catalog:
+                continue
+            if columnar is not None and filename.endswith(COLUMNAR_SUFFIX):
+                try:
+                    with columnar.ColumnarSegment(os.path.join(self.archive_dir, filename)) as segment:
+                        stats = segment.stats()
+                except (OSError, ValueError, KeyError):
+                    continue
+                self._set_catalog_entry(filename, stats)
+                continue
+            try:
+                with zipfile.ZipFile(os.path.join(self.archive_dir, filename), 'r') as zf:
+                    if not zf.namelist():
+                        continue
+                    with zf.open(zf.namelist()[0]) as raw:
+                        stats = _scan_stats(io.TextIOWrapper(raw, encoding='utf-8', newline=''))
+            except (OSError, zipfile.BadZipFile, UnicodeDecodeError, csv.Error):
+                continue
+            self._set_catalog_entry(filename, stats)
+
+    def _catalog_entry(self, zip_filename: str) -> Optional[dict]:
+        with self._catalog_lock:
+            return self._catalog.get(zip_filename)
+
+    def _catalog_excludes(self, zip_filename: str, start_dt: datetime, end_dt: datetime,
+                          sensor_id: Optional[str]) -> bool:
+        """True, jeśli według katalogu archiwum na pewno nie zawiera szukanych odczytów."""
+        entry = self._catalog_entry(zip_filename)
+        if entry is None:
+            return False
+        try:
+            if entry["rows"] == 0:
+                return True
+            if sensor_id is not None and sensor_id not in entry["sensors"]:
+                return True
+            return (datetime.fromisoformat(entry["max_timestamp"]) < start_dt or
+                    datetime.fromisoformat(entry["min_timestamp"]) > end_dt)
+        except (KeyError, TypeError, ValueError):
+            return False
 
     def _clean_old_archives(self) -> None:
         if not self.retention_days or self.retention_days <= 0:
@@ -173,21 +848,21 @@ class Logger:
 
         cutoff_date = datetime.now() - timedelta(days=self.retention_days)
         for filename in os.listdir(self.archive_dir):
-            if filename.endswith(".zip"):
+            if filename.endswith((".zip", COLUMNAR_SUFFIX)):
                 filepath = os.path.join(self.archive_dir, filename)
                 try:
                     file_mod_time = datetime.fromtimestamp(os.path.getmtime(filepath))
                     if file_mod_time < cutoff_date:
                         os.remove(filepath)
+                        self._remove_catalog_entry(filename)
                 except OSError:
                     pass 
 
-    def read_logs(
-        self,
-        start_dt: datetime,
-        end_dt: datetime,
-        sensor_id: Optional[str] = None
-    ) -> Iterator[Dict]:
+    def _query_segments(self, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str]) -> list:
+        """
+        Segmenty, które mogą zawierać odczyty z zapytania: (ścieżka, funkcja odczytu, początek segmentu
+        lub None, czy wiersze są uporządkowane). Archiwa wykluczone przez katalog są pomijane.
+        """
         files_to_check = set()
 
         if self.is_active and self._current_file_path and os.path.exists(self._current_file_path):
@@ -201,80 +876,386 @@ class Logger:
                     filepath = os.path.join(self.log_dir, filename)
                     files_to_check.add(filepath)
         except OSError:
-            return
+            return []
 
-        archive_files_content = {} 
+        archives_to_check = []
         try:
-            for filename in os.listdir(self.archive_dir):
-                if filename.endswith(".zip"):
-                    zip_filepath = os.path.join(self.archive_dir, filename)
-                    try:
-                        with zipfile.ZipFile(zip_filepath, 'r') as zf:
-                            if not zf.namelist(): continue
-                            csv_filename_in_zip = zf.namelist()[0] 
-                            archive_files_content[zip_filepath] = zf.read(csv_filename_in_zip).decode('utf-8').splitlines()
-                    except (zipfile.BadZipFile, IndexError, UnicodeDecodeError):
-                        pass 
+            archive_files = set(os.listdir(self.archive_dir))
         except OSError:
+            archive_files = set()
+        for filename in archive_files:
+            stem = os.path.splitext(filename[:-len(".zip")] if filename.endswith(".zip") else filename)[0]
+            has_columnar = columnar is not None and stem + COLUMNAR_SUFFIX in archive_files
+            if filename.endswith(".csv"):
+                # Segment czekający na kompresję (jeśli archiwum już jest, czytane jest archiwum)
+                if filename + ".zip" not in archive_files and not has_columnar:
+                    files_to_check.add(os.path.join(self.archive_dir, filename))
+            elif filename.endswith(".zip") and has_columnar:
+                continue  # skonwertowane do segmentu kolumnowego (convert_archives z remove_source=False)
+            elif filename.endswith(".zip") or (has_columnar and filename.endswith(COLUMNAR_SUFFIX)):
+                if not self._catalog_excludes(filename, start_dt, end_dt, sensor_id):
+                    archives_to_check.append(os.path.join(self.archive_dir, filename))
+
+        if self.is_active and self._current_file_path in files_to_check:
+            self._flush_pending()
+
+        segments = []
+        for filepath in files_to_check:
+            if self.is_active and filepath == self._current_file_path:
+                is_sorted = bool(self._segment_stats and self._segment_stats.get("sorted"))
+            else:
+                is_sorted = os.path.exists(filepath + INDEX_SUFFIX)
+            segments.append((filepath, self._read_csv_file, None, is_sorted))
+        for archive_filepath in archives_to_check:
+            entry = self._catalog_entry(os.path.basename(archive_filepath)) or {}
+            try:
+                segment_start = datetime.fromisoformat(entry["min_timestamp"])
+            except (KeyError, TypeError, ValueError):
+                segment_start = None
+            if archive_filepath.endswith(COLUMNAR_SUFFIX):
+                segments.append((archive_filepath, self._read_col_file, segment_start, True))
+            else:
+                segments.append((archive_filepath, self._read_zip_file, segment_start, bool(entry.get("sorted"))))
+        return segments
+
+    def query_rollups(
+        self,
+        start_dt: datetime,
+        end_dt: datetime,
+        sensor_id: Optional[str] = None,
+        resolution: Optional[timedelta] = None
+    ) -> list:
+        """
+        Statystyki odczytów (count, sum, min, max, sum_sq, mean, std) z agregatów zamiast surowych wierszy.
+        Przedział [start_dt, end_dt) jest domknięty z lewej; resolution - szerokość kubełków wyniku,
+        None - jeden wynik na czujnik dla całego przedziału. Poziom agregatów dobiera
+        RollupStore.choose_tier (najgrubszy, który pasuje do przedziału i rozdzielczości).
+        """
+        if not self._rollups:
+            print("BŁĄD Loggera: Agregaty są wyłączone (rollups w konfiguracji).")
+            return []
+        self._flush_pending()
+        self._rollups.flush()
+        return self._rollups.query(start_dt, end_dt, sensor_id, resolution)
+
+    def read_logs(
+        self,
+        start_dt: datetime,
+        end_dt: datetime,
+        sensor_id: Optional[str] = None,
+        ordered: bool = False
+    ) -> Iterator[Dict]:
+        """
+        Odczyty z przedziału [start_dt, end_dt] z plików CSV, archiwów ZIP i segmentów kolumnowych.
+        Archiwa są czytane strumieniowo, pojedynczo i dopiero gdy przyjdzie na nie kolej,
+        więc pamięć nie zależy od liczby ani rozmiaru archiwów.
+
+        ordered=True: wiersze w kolejności czasu - scalanie k segmentów kopcem. Segment jest
+        otwierany dopiero, gdy scalanie dojdzie do jego początku (wg katalogu), a w pamięci
+        sortowane są tylko segmenty, o których nie wiadomo, że są uporządkowane.
+        """
+        query = self._query_segments(start_dt, end_dt, sensor_id)
+        if self._use_scan_pool(len(query)):
+            yield from self._read_logs_parallel(query, start_dt, end_dt, sensor_id, ordered)
+            return
+
+        # (początek segmentu lub None, czy wiersze są uporządkowane, generator wierszy)
+        segments = []
+        for filepath, read_file, segment_start, is_sorted in query:
+            segments.append((segment_start, is_sorted, read_file(filepath, start_dt, end_dt, sensor_id, is_sorted)))
+
+        if ordered:
+            yield from _merge_segments(segments)
+        else:
+            for _, _, rows in segments:
+                yield from rows
+
+    def read_logs_columnar(
+        self,
+        start_dt: datetime,
+        end_dt: datetime,
+        sensor_id: Optional[str] = None,
+        ordered: bool = False
+    ) -> Dict:
+        """
+        Odczyty z przedziału [start_dt, end_dt] jako kolumny NumPy zamiast słownika na wiersz
+        (te same segmenty, katalog i indeksy co read_logs; CSV parsowany blokami, wektorowo):
+          "timestamp" - datetime64[us], "value" - float64 (NaN dla wartości nieliczbowych),
+          "sensor_code" / "unit_code" - int32, kody do list "sensor_ids" / "units".
+        ordered=True: wiersze posortowane po czasie (stabilnie).
+        """
+        if np is None:
+            raise ImportError("read_logs_columnar wymaga pakietu numpy")
+
+        timestamps, values, sensor_codes, unit_codes = [], [], [], []
+        sensor_ids, units = {}, {}
+        for blocks in self._scan(self._query_segments(start_dt, end_dt, sensor_id), start_dt, end_dt, sensor_id,
+                                 "columns"):
+            for block in blocks:
+                timestamps.append(block[0])
+                values.append(block[1])
+                sensor_codes.append(_category_codes(block[2], sensor_ids))
+                unit_codes.append(_category_codes(block[3], units))
+
+        columns = {
+            "timestamp": np.concatenate(timestamps) if timestamps else np.empty(0, dtype="datetime64[us]"),
+            "value": np.concatenate(values) if values else np.empty(0, dtype=np.float64),
+            "sensor_code": np.concatenate(sensor_codes) if sensor_codes else np.empty(0, dtype=np.int32),
+            "unit_code": np.concatenate(unit_codes) if unit_codes else np.empty(0, dtype=np.int32),
+        }
+        if ordered:
+            order = np.argsort(columns["timestamp"], kind="stable")
+            columns = {name: column[order] for name, column in columns.items()}
+        columns["sensor_ids"] = list(sensor_ids)
+        columns["units"] = list(units)
+        return columns
+
+    def read_logs_dataframe(
+        self,
+        start_dt: datetime,
+        end_dt: datetime,
+        sensor_id: Optional[str] = None,
+        ordered: bool = True
+    ):
+        """read_logs_columnar jako pandas.DataFrame (sensor_id i unit jako Categorical)."""
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("read_logs_dataframe wymaga pakietu pandas") from None
+
+        columns = self.read_logs_columnar(start_dt, end_dt, sensor_id=sensor_id, ordered=ordered)
+        return pd.DataFrame({
+            "timestamp": columns["timestamp"],
+            "sensor_id": pd.Categorical.from_codes(columns["sensor_code"], categories=columns["sensor_ids"]),
+            "value": columns["value"],
+            "unit": pd.Categorical.from_codes(columns["unit_code"], categories=columns["units"]),
+        })
+
+    def aggregate_logs(self, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str] = None) -> list:
+        """
+        Statystyki odczytów z przedziału [start_dt, end_dt] liczone z surowych segmentów (każdy segment
+        agregowany osobno - równolegle przy scan_workers > 1). Wynik w formacie query_rollups:
+        jeden słownik na czujnik (count, sum, min, max, sum_sq, mean, std); wartości nieliczbowe są pomijane.
+        """
+        groups = {}
+        for partial in self._scan(self._query_segments(start_dt, end_dt, sensor_id), start_dt, end_dt, sensor_id,
+                                  "aggregate"):
+            for name, stats in partial.items():
+                if (start_dt, name) in groups:
+                    merge_stats(groups[(start_dt, name)], stats)
+                else:
+                    groups[(start_dt, name)] = stats
+        return summarize(groups)
+
+    # --- Równoległy skan segmentów ---
+
+    def _use_scan_pool(self, segment_count: int) -> bool:
+        return self.scan_workers > 1 and segment_count > 1
+
+    def _get_scan_executor(self) -> ProcessPoolExecutor:
+        with self._scan_lock:
+            if self._scan_executor is None:
+                # spawn: procesy robocze nie dziedziczą wątków i blokad Loggera (jak w serwerze wieloprocesowym).
+                self._scan_executor = ProcessPoolExecutor(max_workers=self.scan_workers,
+                                                          mp_context=multiprocessing.get_context("spawn"))
+            return self._scan_executor
+
+    def _shutdown_scan_executor(self) -> None:
+        with self._scan_lock:
+            executor, self._scan_executor = self._scan_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _scan(self, segments: list, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str],
+              mode: str) -> Iterator:
+        """
+        Wyniki _scan_segment dla kolejnych segmentów (z _query_segments), zawsze w ich kolejności.
+        Przy scan_workers > 1 segmenty skanują procesy robocze - w toku najwyżej 2 * scan_workers,
+        więc pamięć nie rośnie z liczbą segmentów; bez puli (lub po jej awarii) - bieżący proces.
+        """
+        tasks = [(read_file, filepath, start_dt, end_dt, sensor_id, is_sorted, mode)
+                 for filepath, read_file, _, is_sorted in segments]
+        if not self._use_scan_pool(len(tasks)):
+            for task in tasks:
+                yield _scan_segment(*task)
+            return
+
+        executor = self._get_scan_executor()
+        remaining = iter(tasks)
+        pending = deque((task, executor.submit(_scan_segment, *task))
+                        for task in itertools.islice(remaining, 2 * self.scan_workers))
+        try:
+            while pending:
+                task, future = pending[0]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    print(f"BŁĄD Loggera: Równoległy skan segmentów przerwany ({e}). Kontynuacja w bieżącym procesie.")
+                    self._shutdown_scan_executor()
+                    for task in [task for task, _ in pending] + list(remaining):
+                        yield _scan_segment(*task)
+                    pending.clear()
+                    return
+                pending.popleft()
+                for task in itertools.islice(remaining, 1):
+                    pending.append((task, executor.submit(_scan_segment, *task)))
+                yield result
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def _read_logs_parallel(self, query: list, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str],
+                            ordered: bool) -> Iterator[Dict]:
+        if ordered:
+            # Kolejność zadań = kolejność otwierania segmentów w _merge_segments: najpierw segmenty bez znanego
+            # początku, potem według początku - dzięki temu kolejny wynik zawsze należy do otwieranego segmentu.
+            query = sorted(query, key=lambda s: (s[2] is not None, s[2] or datetime.min))
+        # _scan zwraca wyniki w kolejności zadań - para (ścieżka segmentu, wynik) wiąże je z segmentem.
+        results = zip([filepath for filepath, _, _, _ in query], self._scan(query, start_dt, end_dt, sensor_id, "rows"))
+        ready = {}  # wyniki segmentów, które jeszcze nie zostały otwarte
+
+        def segment_rows(filepath):
+            while filepath not in ready:
+                path, columns = next(results)
+                ready[path] = columns
+            columns = ready.pop(filepath)
+            if np is not None:
+                columns[0] = columns[0].tolist()
+            for timestamp, sensor, value, unit in zip(*columns):
+                yield {"timestamp": timestamp, "sensor_id": sensor, "value": value, "unit": unit}
+
+        if ordered:
+            yield from _merge_segments([(segment_start, True, segment_rows(filepath))
+                                        for filepath, _, segment_start, _ in query])
+        else:
+            for filepath, _, _, _ in query:
+                yield from segment_rows(filepath)
+
+    @staticmethod
+    def _read_csv_file(filepath: str, start_dt: datetime, end_dt: datetime,
+                       sensor_id: Optional[str], is_sorted: bool = False, columnar_blocks: bool = False):
+        read_segment = Logger._read_segment_columns if columnar_blocks else Logger._read_segment
+        index = None
+        if is_sorted and os.path.exists(filepath + INDEX_SUFFIX):
+            try:
+                with open(filepath + INDEX_SUFFIX, 'r', encoding='utf-8') as f:
+                    index = _parse_index(f.read())
+            except IOError:
+                pass
+        try:
+            with open(filepath, 'rb') as raw:
+                yield from read_segment(raw, start_dt, end_dt, sensor_id, is_sorted, index)
+        except IOError: pass
+        except Exception: pass
+
+    @staticmethod
+    def _read_zip_file(zip_filepath: str, start_dt: datetime, end_dt: datetime,
+                       sensor_id: Optional[str], is_sorted: bool = False, columnar_blocks: bool = False):
+        read_segment = Logger._read_segment_columns if columnar_blocks else Logger._read_segment
+        try:
+            with zipfile.ZipFile(zip_filepath, 'r') as zf:
+                if not zf.namelist(): return
+                csv_filename_in_zip = zf.namelist()[0]
+                index = None
+                if csv_filename_in_zip + INDEX_SUFFIX in zf.namelist():
+                    index = _parse_index(zf.read(csv_filename_in_zip + INDEX_SUFFIX).decode('utf-8'))
+                    is_sorted = True  # indeks jest zapisywany tylko dla segmentów uporządkowanych
+                with zf.open(csv_filename_in_zip) as raw:
+                    yield from read_segment(raw, start_dt, end_dt, sensor_id, is_sorted, index)
+        except (OSError, zipfile.BadZipFile, UnicodeDecodeError, csv.Error):
             pass
 
+    @staticmethod
+    def _read_col_file(col_filepath: str, start_dt: datetime, end_dt: datetime,
+                      sensor_id: Optional[str], is_sorted: bool = True, columnar_blocks: bool = False):
+        """Segment kolumnowy: porcje spoza zapytania pomijane wg statystyk, wiersze w kolejności czasu."""
+        try:
+            with columnar.ColumnarSegment(col_filepath) as segment:
+                timestamps, values, sensor_codes, unit_codes = segment.query(
+                    np.datetime64(start_dt, 'us'), np.datetime64(end_dt, 'us'), sensor_id)
+                sensor_names, unit_names = np.array(segment.sensor_ids), np.array(segment.units)
+        except (OSError, ValueError, KeyError):
+            return
+        if not len(timestamps):
+            return
+        sensors, units = sensor_names[sensor_codes], unit_names[unit_codes]
+        if columnar_blocks:
+            yield timestamps, values, sensors, units
+            return
+        for record_ts, sensor, value, unit in zip(timestamps.tolist(), sensors.tolist(), values.tolist(), units.tolist()):
+            yield {"timestamp": record_ts, "sensor_id": sensor, "value": value, "unit": unit}
+
+    @staticmethod
+    def _read_segment(raw, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str],
+                      is_sorted: bool = False, index=None) -> Iterator[Dict]:
+        """
+        Wiersze jednego segmentu (pliku CSV lub pliku w archiwum, otwartego binarnie) pasujące do zapytania.
+        Dla segmentu uporządkowanego czasowo: z indeksem - skok (seek) do ostatniego wpisu przed start_dt,
+        a czytanie kończy się na pierwszym wierszu po end_dt.
+        """
+        actual_headers = _read_header(raw)
+        if actual_headers is None:
+            return
+        _seek_index(raw, index, start_dt)
+        reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''), fieldnames=actual_headers)
 
-        for filepath in list(files_to_check): 
+        for row in reader:
             try:
-                if self.is_active and filepath == self._current_file_path:
-                    self._flush_buffer()
+                ts_str = row.get("timestamp")
+                if not ts_str: continue
+                try:
+                    record_ts = datetime.fromisoformat(ts_str)
+                except ValueError:
+                    record_ts = datetime.strptime(ts_str.split('.')[0], '%Y-%m-%dT%H:%M:%S')
 
-                with open(filepath, 'r', newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
+                if is_sorted and record_ts > end_dt:
+                    return
+                if start_dt <= record_ts <= end_dt:
+                    if sensor_id is None or row.get("sensor_id") == sensor_id:
                         try:
-                            ts_str = row.get("timestamp")
-                            if not ts_str: continue
-                            try:
-                                record_ts = datetime.fromisoformat(ts_str)
-                            except ValueError:
-                                record_ts = datetime.strptime(ts_str.split('.')[0], '%Y-%m-%dT%H:%M:%S')
-                            
-                            if start_dt <= record_ts <= end_dt:
-                                if sensor_id is None or row.get("sensor_id") == sensor_id:
-                                    try:
-                                        row["value"] = float(row["value"])
-                                    except (ValueError, TypeError): pass 
-                                    row["timestamp"] = record_ts 
-                                    yield row
-                        except (csv.Error, ValueError, TypeError): pass
-            except IOError: pass
-            except Exception: pass
-
-        for zip_filepath, lines in archive_files_content.items():
-            if not lines or len(lines) < 2: continue
-            
-            header_line = lines[0]
-            expected_headers = ["timestamp", "sensor_id", "value", "unit"]
-            actual_headers = [h.strip() for h in header_line.split(',')]
-            
-            if not all(eh in actual_headers for eh in expected_headers): continue
-
-            reader = csv.DictReader(lines[1:], fieldnames=actual_headers)
-            for row in reader:
-                try:
-                    ts_str = row.get("timestamp")
-                    if not ts_str: continue
-                    try:
-                        record_ts = datetime.fromisoformat(ts_str)
-                    except ValueError:
-                         record_ts = datetime.strptime(ts_str.split('.')[0], '%Y-%m-%dT%H:%M:%S')
-
-                    if start_dt <= record_ts <= end_dt:
-                        if sensor_id is None or row.get("sensor_id") == sensor_id:
-                            try:
-                                row["value"] = float(row["value"])
-                            except (ValueError, TypeError):
-                                pass
-                            row["timestamp"] = record_ts
-                            yield row
-                except (csv.Error, ValueError, TypeError):
-                    pass
-
-                except Exception:
-                    pass
\ No newline at end of file
+                            row["value"] = float(row["value"])
+                        except (ValueError, TypeError):
+                            pass
+                        row["timestamp"] = record_ts
+                        yield row
+            except (csv.Error, ValueError, TypeError):
+                pass
+
+    @staticmethod
+    def _read_segment_columns(raw, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str],
+                              is_sorted: bool = False, index=None):
+        """
+        Jak _read_segment, ale blokami po ok. COLUMNAR_BLOCK_BYTES: (timestamp, value, sensor_id, unit)
+        jako tablice NumPy z wierszami pasującymi do zapytania. Segment uporządkowany kończy się
+        na pierwszym bloku sięgającym za end_dt.
+        """
+        actual_headers = _read_header(raw)
+        if actual_headers is None:
+            return
+        _seek_index(raw, index, start_dt)
+        positions = [actual_headers.index(name) for name in ("timestamp", "sensor_id", "value", "unit")]
+        start, end = np.datetime64(start_dt, 'us'), np.datetime64(end_dt, 'us')
+
+        tail = b''
+        while True:
+            chunk = raw.read(COLUMNAR_BLOCK_BYTES)
+            if chunk:
+                # Blok kończy się na ostatniej pełnej linii, reszta przechodzi do następnego.
+                data = tail + chunk
+                cut = data.rfind(b'\n') + 1
+                data, tail = data[:cut], data[cut:]
+            elif tail:
+                data, tail = tail, b''
+            else:
+                return
+            block = _csv_columns(data.decode('utf-8'), positions, len(actual_headers))
+            if block is None:
+                continue
+            timestamps, values, sensors, units = block
+            mask = (timestamps >= start) & (timestamps <= end)
+            if sensor_id is not None:
+                mask &= sensors == sensor_id
+            if mask.any():
+                yield timestamps[mask], values[mask], sensors[mask], units[mask]
+            if is_sorted and timestamps[-1] > end:
+                return
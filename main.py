@@ -4,14 +4,17 @@ import sys
 
 from sensors import TemperatureSensor, HumiditySensor, PressureSensor, LightSensor
 from logger import Logger
-from network.client import NetworkClient
+from network.client import NetworkClient, ReadingBatch
 from network.config import load_config
+from network.spool import Spool
 
 
 def main():
     # 1. Wczytaj konfigurację sieci z YAML i loggera z JSON
     try:
-        net_cfg = load_config("config.yaml")["network"]
+        app_cfg = load_config("config.yaml")
+        net_cfg = app_cfg["network"]
+        spool_cfg = app_cfg.get("spool") or {}
         logger_config_path = "config.json"
         logger = Logger(logger_config_path)
         logger.start()
@@ -37,27 +40,67 @@ def main():
         s.start()
 
     # 3. Zainicjuj i połącz klienta sieciowego
+    spool = None
+    if spool_cfg.get("enabled", False):
+        spool = Spool(
+            spool_cfg.get("spool_dir", "./spool"),
+            max_size_mb=spool_cfg.get("max_size_mb", 5),
+            rotate_after_lines=spool_cfg.get("rotate_after_lines", 100000),
+            retention_days=spool_cfg.get("retention_days", 7),
+            fsync_every=int(spool_cfg.get("fsync_every", 100)),
+            fsync_interval=float(spool_cfg.get("fsync_interval", 1.0))
+        )
+
     client = NetworkClient(
         host=net_cfg["host"],
         port=int(net_cfg["port"]),  # Upewnij się, że port jest int
         timeout=float(net_cfg.get("timeout", 5.0)),  # Użyj .get i konwertuj na float
         retries=int(net_cfg.get("retries", 3)),  # Użyj .get i konwertuj na int
-        logger=logger
+        logger=logger,
+        window_size=int(net_cfg.get("window_size", 0)),  # 0 = czekaj na ACK po każdej wiadomości
+        protocol=net_cfg.get("protocol", "json"),
+        outbox_size=int(net_cfg.get("outbox_size", 1000)),
+        overflow_policy=net_cfg.get("overflow_policy", "drop_oldest"),
+        sender_batch_size=int(net_cfg.get("sender_batch_size", 100)),
+        spool=spool,
+        replay_batch_size=int(spool_cfg.get("replay_batch_size", 1000))
     )
+    # async_send: odczyty trafiają do kolejki, wysyła je osobny wątek - próbkowanie nie czeka na sieć.
+    # Spool działa w wątku wysyłającym, więc go wymusza.
+    async_send = bool(net_cfg.get("async_send", False)) or spool is not None
 
     try:
         print(f"Attempting to connect to server at {net_cfg['host']}:{net_cfg['port']}...")
         client.connect()
+        if async_send:
+            client.start_sender()
 
     except Exception as e:
-        print(f"CRITICAL: Failed to connect to network server: {e}. Exiting.")
+        if spool is not None:
+            # Ze spoolem brak serwera nie jest krytyczny: odczyty trafiają na dysk,
+            # a wątek wysyłający łączy się ponownie w tle.
+            print(f"WARNING: Failed to connect to network server: {e}. Readings will be spooled until it is reachable.")
+            logger.log_reading("startup", datetime.now(), 0, f"client_connect_failed_spooling: {type(e).__name__}")
+            client.start_sender()
+        else:
+            print(f"CRITICAL: Failed to connect to network server: {e}. Exiting.")
 
-        logger.log_reading("startup", datetime.now(), 0, f"client_connect_failed: {type(e).__name__}")
-        logger.stop()
-        sys.exit(1)
+            logger.log_reading("startup", datetime.now(), 0, f"client_connect_failed: {type(e).__name__}")
+            logger.stop()
+            sys.exit(1)
 
     # 4. Pętla do cyklicznego odczytu i wysyłki
+    # batch_max_size > 1: odczyty idą jedną ramką wsadową na takt (lub po przekroczeniu progu rozmiaru/wieku)
+    batch_max_size = int(net_cfg.get("batch_max_size", 1))
+    batch = ReadingBatch(max_size=batch_max_size, max_age=float(net_cfg.get("batch_max_age", 1.0)))
+
+    def flush_batch():
+        readings = batch.drain()
+        if readings and not client.send_batch(readings):
+            print(f"ALERT: Failed to send batch of {len(readings)} readings after all retries. Check server and network.")
+
     def sensor_loop():
+        last_dropped = 0
         try:
             while True:
 
@@ -72,10 +115,25 @@ def main():
                         }
                         print(f"Odczyt: {data_payload['sensor_id']} = {data_payload['value']} {data_payload['unit']}")
 
-                        if not client.send(data_payload):
+                        if async_send:
+                            client.submit(data_payload)
+                        elif batch_max_size > 1:
+                            batch.add(data_payload)
+                            if batch.is_full():
+                                flush_batch()
+                        elif not client.send(data_payload):
                             print(
                                 f"ALERT: Failed to send data for sensor {sensor.sensor_id} after all retries. Check server and network.")
 
+                if async_send:
+                    stats = client.get_stats()
+                    dropped = stats["dropped_oldest"] + stats["dropped_newest"]
+                    if dropped > last_dropped:
+                        print(f"ALERT: Outbox full ({stats['queue_depth']}/{stats['queue_capacity']}), "
+                              f"{dropped - last_dropped} readings dropped. Check server and network.")
+                        last_dropped = dropped
+                else:
+                    flush_batch()
                 time.sleep(1)
         except KeyboardInterrupt:
             print("\nSensor loop interrupted by user.")
@@ -86,6 +144,9 @@ def main():
         finally:
             print("Closing network client and logger...")
             if client:
+                if async_send:
+                    client.stop_sender()
+                    print(f"Sender stats: {client.get_stats()}")
                 client.close()
             if logger:
                 logger.stop()
@@ -1,13 +1,37 @@
 import socket
+import select
 import json
+import threading
 import time
+from collections import deque
 from datetime import datetime # <<< DODANO IMPORT
 
+from network import protocol
+
 class NetworkClient:
     """
     Klient TCP do wysyłania danych w formacie JSON z obsługą powtórzeń, potwierdzenia i logowania zdarzeń.
+
+    Przy window_size > 0 klient działa w trybie potokowym: wiadomości dostają numer "seq",
+    do window_size wiadomości może czekać jednocześnie na potwierdzenie, serwer potwierdza
+    je zbiorczo ("ACK <seq>"), a po ack_timeout bez postępu niepotwierdzone wiadomości
+    są wysyłane ponownie.
+
+    Przy protocol="binary" klient uzgadnia z serwerem zwarty format binarny (network/protocol.py);
+    jeśli serwer go nie obsługuje, pozostaje przy JSON.
+
+    Tryb asynchroniczny (start_sender/submit/stop_sender): odczyty trafiają do ograniczonej
+    kolejki (outbox), a osobny wątek wysyła je paczkami i sam wznawia połączenie - wywołujący
+    nigdy nie czeka na sieć. Po zapełnieniu kolejki działa overflow_policy:
+    "block" (submit czeka), "drop_oldest" albo "drop_newest".
+    Z podanym spool (network/spool.py) niewysłane odczyty trafiają na dysk i są odtwarzane
+    po wznowieniu połączenia.
     """
-    def __init__(self, host, port, timeout=5.0, retries=3, logger=None):
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, host, port, timeout=5.0, retries=3, logger=None, window_size=0, ack_timeout=None,
+                 protocol="json", outbox_size=1000, overflow_policy="drop_oldest", sender_batch_size=100,
+                 spool=None, replay_batch_size=1000):
         """
         Inicjalizuje klienta sieciowego.
         """
@@ -17,6 +41,31 @@ class NetworkClient:
         self.retries = retries
         self.sock = None
         self.logger = logger
+        self.window_size = window_size
+        self.ack_timeout = ack_timeout if ack_timeout is not None else timeout
+        self._next_seq = 0
+        self._in_flight = deque()  # (seq, dane, zakodowana wiadomość) w kolejności wysłania
+        self._last_ack_progress = 0.0
+        self._ack_buffer = b''
+        self._closing = False
+        self.protocol = protocol
+        self._binary = False
+        self._encoder = None
+
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {self.OVERFLOW_POLICIES}, got '{overflow_policy}'")
+        self.outbox_size = outbox_size
+        self.overflow_policy = overflow_policy
+        self.sender_batch_size = sender_batch_size
+        self._outbox = deque()
+        self._outbox_cond = threading.Condition()
+        self._sender_thread = None
+        self._sender_running = False
+        self._sender_stop = threading.Event()
+        self._stats = {"submitted": 0, "sent": 0, "send_failures": 0, "dropped_oldest": 0, "dropped_newest": 0,
+                       "spooled": 0, "replayed": 0}
+        self.spool = spool
+        self.replay_batch_size = replay_batch_size
 
     def connect(self):
         """
@@ -31,37 +80,85 @@ class NetworkClient:
 
                 self.logger.log_reading("network", datetime.now(), 1, "connect_success")
             print(f"Successfully connected to {self.host}:{self.port}")
+            self._ack_buffer = b''
+            if self.protocol == "binary":
+                self._negotiate_binary()
+            if self._in_flight:
+                # Wiadomości niepotwierdzone na poprzednim połączeniu idą ponownie jako pierwsze
+                # (kodowane od nowa - protokół nowego połączenia mógł się zmienić).
+                self._in_flight = deque((seq, data, self._encode(data, seq)) for seq, data, _ in self._in_flight)
+                self.sock.sendall(b''.join(msg for _, _, msg in self._in_flight))
+                self._last_ack_progress = time.monotonic()
         except socket.timeout:
+            self._discard_socket()
             if self.logger:
                 self.logger.log_reading("network", datetime.now(), 0, "connect_timeout")
 
             raise TimeoutError(f"Connection to {self.host}:{self.port} timed out after {self.timeout}s")
         except ConnectionRefusedError:
+            self._discard_socket()
             if self.logger:
                 self.logger.log_reading("network", datetime.now(), 0, "connect_refused")
             raise ConnectionRefusedError(f"Connection to {self.host}:{self.port} was refused.")
         except Exception as e:
+            self._discard_socket()
             if self.logger:
                 self.logger.log_reading("network", datetime.now(), 0, f"connect_error: {type(e).__name__}")
             raise Exception(f"Failed to connect to {self.host}:{self.port}: {e}")
 
 
+    def _negotiate_binary(self) -> None:
+        """Wysyła HELLO BIN1; przy odpowiedzi OK BIN1 przełącza połączenie na ramki binarne."""
+        self.sock.sendall(f"{protocol.HANDSHAKE_BINARY}\n".encode('ascii'))
+        response = b''
+        while b'\n' not in response:
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                break
+            response += chunk
+
+        self._binary = response.strip() == protocol.HANDSHAKE_BINARY_OK.encode('ascii')
+        if self._binary:
+            if self._encoder is None:
+                self._encoder = protocol.BinaryEncoder()
+            else:
+                # Nowe połączenie = nowy słownik po stronie serwera.
+                self.sock.sendall(self._encoder.definitions())
+            if self.logger:
+                self.logger.log_reading("network", datetime.now(), 1, "binary_protocol_enabled")
+        else:
+            if self.logger:
+                self.logger.log_reading("network", datetime.now(), 0, "binary_protocol_rejected")
+            print(f"Server does not support binary protocol ({response.decode(errors='ignore').strip()}), using JSON.")
+
+    def _encode(self, data: dict, seq=None) -> bytes:
+        """Koduje wiadomość do postaci wysyłanej na aktualnym połączeniu (linia JSON lub ramka binarna)."""
+        if self._binary:
+            return self._encoder.encode(data, seq or 0)
+        if seq is not None:
+            data = dict(data, seq=seq)
+        return self._serialize(data) + b'\n'
+
     def send(self, data: dict) -> bool:
         """
         Wysyła dane (dict) jako JSON i czeka na ACK. Zwraca True/False.
+        W trybie potokowym zwraca True, gdy wiadomość zmieściła się w oknie i została wysłana.
         """
+        if self.window_size > 0:
+            return self._send_pipelined(data)
+
         if not self.sock:
             if self.logger:
                 self.logger.log_reading("network", datetime.now(), 0, "send_fail_no_socket")
             print("Cannot send data: socket is not available.")
             return False
 
-        msg = self._serialize(data)
+        msg = self._encode(data)
         for i in range(self.retries):
             try:
-                self.sock.sendall(msg + b'\n')
+                self.sock.sendall(msg)
                 ack = self.sock.recv(1024)
-                if b"ACK" in ack:
+                if ack.startswith(b"ACK"):  # "NACK_..." też zawiera "ACK"
                     if self.logger:
                         self.logger.log_reading("network", datetime.now(), 1, "send_ack_received")
                     return True
@@ -104,10 +201,158 @@ class NetworkClient:
         print("Send failed after all retries (no ACK or unexpected response).")
         return False
 
+    def send_batch(self, readings: list) -> bool:
+        """
+        Wysyła listę odczytów jako jedną ramkę {"type": "batch", "readings": [...]} z jednym ACK.
+        """
+        if not readings:
+            return True
+        return self.send({"type": "batch", "readings": list(readings)})
+
+    def flush(self) -> bool:
+        """
+        W trybie potokowym czeka na potwierdzenie wszystkich wysłanych wiadomości.
+        """
+        if self.window_size <= 0 or not self._in_flight:
+            return True
+        return self._wait_for_window(0)
+
+    def _send_pipelined(self, data: dict) -> bool:
+        if not self.sock:
+            if self.logger:
+                self.logger.log_reading("network", datetime.now(), 0, "send_fail_no_socket")
+            print("Cannot send data: socket is not available.")
+            return False
+
+        if not self._wait_for_window(self.window_size - 1):
+            return False
+
+        self._next_seq += 1
+        msg = self._encode(data, self._next_seq)
+        try:
+            self.sock.sendall(msg)
+        except socket.error as e:
+            if self.logger:
+                self.logger.log_reading("network", datetime.now(), 0, f"send_socket_error: {type(e).__name__}")
+            print(f"Socket error during pipelined send: {e}")
+            self.close()
+            return False
+
+        if not self._in_flight:
+            self._last_ack_progress = time.monotonic()
+        self._in_flight.append((self._next_seq, data, msg))
+        # Wiadomość jest już w oknie: po zerwaniu połączenia connect() wyśle ją ponownie,
+        # więc wywołujący nie może jej odłożyć i wysłać drugi raz.
+        self._read_acks(0)
+        return True
+
+    def _wait_for_window(self, max_in_flight: int) -> bool:
+        """
+        Odbiera potwierdzenia, dopóki w oknie jest więcej niż max_in_flight wiadomości.
+        Po ack_timeout bez postępu wysyła ponownie tylko niepotwierdzone wiadomości (maks. retries razy).
+        """
+        attempt = 0
+        while len(self._in_flight) > max_in_flight:
+            if not self.sock:
+                return False
+
+            remaining = self._last_ack_progress + self.ack_timeout - time.monotonic()
+            if remaining <= 0:
+                attempt += 1
+                if attempt > self.retries:
+                    if self.logger:
+                        self.logger.log_reading("network", datetime.now(), 0, f"send_fail_unacked_{len(self._in_flight)}")
+                    print(f"Send failed after all retries: {len(self._in_flight)} messages were not acknowledged.")
+                    if self.spool is not None:
+                        self._park(self._unbatch(data for _, data, _ in self._in_flight))
+                        self._in_flight.clear()
+                    else:
+                        # Bez spoola wiadomości zostają w oknie - connect() wyśle je po wznowieniu połączenia.
+                        self._discard_socket()
+                    return False
+
+                if self.logger:
+                    self.logger.log_reading("network", datetime.now(), 0, f"send_retransmit_attempt_{attempt}")
+                print(f"ACK timeout, retransmitting {len(self._in_flight)} unacknowledged messages (attempt {attempt}/{self.retries}).")
+                try:
+                    self.sock.sendall(b''.join(msg for _, _, msg in self._in_flight))
+                except socket.error as e:
+                    print(f"Socket error during retransmission: {e}")
+                    self.close()
+                    return False
+                self._last_ack_progress = time.monotonic()
+                continue
+
+            if not self._read_acks(remaining):
+                return False
+        return True
+
+    def _read_acks(self, wait: float) -> bool:
+        """
+        Odbiera dostępne potwierdzenia (czekając najwyżej wait sekund) i usuwa potwierdzone wiadomości z okna.
+        "ACK <seq>" potwierdza wszystko do <seq> włącznie; samo "ACK" (starszy serwer) - najstarszą wiadomość.
+        """
+        try:
+            readable, _, _ = select.select([self.sock], [], [], max(wait, 0))
+            if not readable:
+                return True
+            chunk = self.sock.recv(4096)
+        except (socket.error, ValueError) as e:
+            print(f"Socket error while reading ACKs: {e}")
+            self.close()
+            return False
+
+        if not chunk:
+            if self.logger:
+                self.logger.log_reading("network", datetime.now(), 0, "send_fail_connection_closed")
+            print("Server closed the connection.")
+            self.close()
+            return False
+
+        *lines, self._ack_buffer = (self._ack_buffer + chunk).split(b'\n')
+        for line in lines:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0].startswith(b"NACK"):
+                # Odpowiedź ostateczna: serwer odrzucił wiadomość, ponowienie nic nie zmieni.
+                # "NACK_... <seq>" zamyka wiadomości do <seq>. Samo "NACK_..." nie wskazuje wiadomości
+                # (np. odrzucona ramka FRAME_DEFINE), więc okna nie przesuwa - bez ACK wiadomości zostaną ponowione.
+                if self.logger:
+                    self.logger.log_reading("network", datetime.now(), 0, f"send_nack: {line.decode(errors='ignore')}")
+                print(f"Server rejected a message: {line.decode(errors='ignore')}")
+                if len(parts) == 1:
+                    continue
+            elif parts[0] != b"ACK":
+                if self.logger:
+                    self.logger.log_reading("network", datetime.now(), 0, f"send_nack_or_unexpected_response: {line.decode(errors='ignore')}")
+                print(f"Received unexpected response from server: {line.decode(errors='ignore')}")
+                continue
+
+            acked = len(self._in_flight)
+            if len(parts) > 1:
+                try:
+                    acked_seq = int(parts[1])
+                except ValueError:
+                    continue
+                while self._in_flight and self._in_flight[0][0] <= acked_seq:
+                    self._in_flight.popleft()
+            elif self._in_flight:
+                self._in_flight.popleft()
+            if len(self._in_flight) < acked:
+                self._last_ack_progress = time.monotonic()
+        return True
+
     def close(self):
         """
         Zamyka połączenie.
         """
+        if self.sock and self._in_flight and not self._closing:
+            self._closing = True
+            try:
+                self.flush()
+            finally:
+                self._closing = False
         if self.sock:
             try:
                 self.sock.close()
@@ -120,9 +365,232 @@ class NetworkClient:
                 print(f"Error closing socket: {e}")
             finally:
                 self.sock = None
+                self._ack_buffer = b''
+
+    def _discard_socket(self) -> None:
+        """Zamyka gniazdo po nieudanym połączeniu, tak aby self.sock nie wskazywał na niepołączone gniazdo."""
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    # --- Tryb asynchroniczny: ograniczona kolejka + wątek wysyłający ---
+
+    def start_sender(self) -> None:
+        """Uruchamia wątek wysyłający odczyty z kolejki (outbox)."""
+        if self._sender_thread and self._sender_thread.is_alive():
+            return
+        self._sender_running = True
+        self._sender_stop.clear()
+        self._sender_thread = threading.Thread(target=self._sender_loop, name="NetworkClientSender", daemon=True)
+        self._sender_thread.start()
+
+    def submit(self, data: dict) -> bool:
+        """
+        Dodaje odczyt do kolejki bez czekania na sieć. Zwraca False, jeśli odczyt odrzucono
+        (drop_newest przy pełnej kolejce albo zatrzymany wątek wysyłający).
+        """
+        with self._outbox_cond:
+            if len(self._outbox) >= self.outbox_size:
+                if self.overflow_policy == "drop_newest":
+                    self._stats["dropped_newest"] += 1
+                    return False
+                if self.overflow_policy == "drop_oldest":
+                    self._outbox.popleft()
+                    self._stats["dropped_oldest"] += 1
+                else:
+                    while len(self._outbox) >= self.outbox_size and self._sender_running:
+                        self._outbox_cond.wait()
+                    if not self._sender_running:
+                        return False
+            self._outbox.append(data)
+            self._stats["submitted"] += 1
+            self._outbox_cond.notify_all()
+        return True
+
+    def stop_sender(self, timeout: float = 10.0) -> None:
+        """
+        Zatrzymuje wątek wysyłający. Do timeout sekund czeka, aż kolejka zostanie wysłana;
+        odczyty, których nie udało się wysłać, trafiają do spoola (jeśli jest), a bez niego
+        pozostają w kolejce (widoczne w get_stats()).
+        """
+        if not self._sender_thread:
+            return
+        deadline = time.monotonic() + timeout
+        with self._outbox_cond:
+            while self._outbox and self._sender_thread.is_alive() and time.monotonic() < deadline:
+                self._outbox_cond.wait(timeout=0.1)
+            self._sender_running = False
+            self._outbox_cond.notify_all()
+        self._sender_stop.set()
+        self._sender_thread.join(timeout=max(deadline - time.monotonic(), 0.1) + self.timeout)
+        self._sender_thread = None
+
+        if self.spool is not None:
+            with self._outbox_cond:
+                remaining = list(self._outbox)
+                self._outbox.clear()
+            self._park(remaining)
+            self.spool.close()
+
+    def get_stats(self) -> dict:
+        """Liczniki trybu asynchronicznego: głębokość kolejki, wysłane, porzucone, nieudane wysyłki."""
+        with self._outbox_cond:
+            return dict(self._stats, queue_depth=len(self._outbox), queue_capacity=self.outbox_size)
+
+    def _sender_loop(self) -> None:
+        backoff = 0.5
+        next_reconnect = 0.0
+        while True:
+            with self._outbox_cond:
+                while not self._outbox and not self._spool_pending() and self._sender_running:
+                    self._outbox_cond.wait(timeout=1.0)
+                if not self._sender_running:
+                    return
+                if self.spool is not None and not self.sock:
+                    batch = list(self._outbox)  # bez połączenia całą kolejkę odkładamy na dysk
+                    self._outbox.clear()
+                else:
+                    batch = [self._outbox.popleft() for _ in range(min(len(self._outbox), self.sender_batch_size))]
+                self._outbox_cond.notify_all()  # zwolniło się miejsce dla "block"
+
+            if not self.sock and time.monotonic() >= next_reconnect:
+                try:
+                    self.connect()
+                    backoff = 0.5
+                except Exception as e:
+                    print(f"Sender: reconnect failed: {e}. Retrying in {backoff:.1f}s.")
+                    next_reconnect = time.monotonic() + backoff
+                    backoff = min(backoff * 2, 30.0)
+
+            if not self.sock:
+                self._park(batch)
+                if self.spool is not None:
+                    # Budzimy się przy nowych odczytach, żeby od razu trafiały do spoola.
+                    with self._outbox_cond:
+                        if self._sender_running and not self._outbox:
+                            self._outbox_cond.wait(timeout=max(next_reconnect - time.monotonic(), 0))
+                else:
+                    self._sender_sleep(max(next_reconnect - time.monotonic(), 0))
+                continue
+
+            if self._spool_pending():
+                # Najpierw zaległości ze spoola; nowe odczyty trafiają za nimi, żeby zachować kolejność.
+                self._park(batch)
+                if not self._replay_spool():
+                    self._sender_sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                continue
+
+            if not batch:
+                continue
+            ok = self.send(batch[0]) if len(batch) == 1 else self.send_batch(batch)
+            with self._outbox_cond:
+                if ok:
+                    self._stats["sent"] += len(batch)
+                else:
+                    self._stats["send_failures"] += 1
+            if not ok:
+                self._park(batch)
+                self._sender_sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    @staticmethod
+    def _unbatch(messages) -> list:
+        """Rozwija ramki wsadowe z powrotem do listy pojedynczych odczytów."""
+        readings = []
+        for data in messages:
+            if data.get("type") == "batch" and isinstance(data.get("readings"), list):
+                readings.extend(data["readings"])
+            else:
+                readings.append(data)
+        return readings
+
+    def _spool_pending(self) -> bool:
+        return self.spool is not None and self.spool.has_pending()
+
+    def _park(self, batch: list) -> None:
+        """Odkłada niewysłane odczyty: do spoola na dysku, a bez spoola - z powrotem do kolejki."""
+        if not batch:
+            return
+        if self.spool is None:
+            self._requeue(batch)
+            return
+        try:
+            self.spool.append_many(batch)
+            with self._outbox_cond:
+                self._stats["spooled"] += len(batch)
+        except OSError as e:
+            print(f"Sender: cannot write to spool: {e}")
+            self._requeue(batch)
+
+    def _replay_spool(self) -> bool:
+        """
+        Wysyła zaległe odczyty ze spoola dużymi paczkami (jedno ACK na paczkę) i po potwierdzeniu
+        przesuwa punkt kontrolny. Dostarczanie jest "co najmniej raz" - po zerwaniu połączenia
+        w trakcie paczki może ona dotrzeć do serwera ponownie.
+        """
+        readings, position = self.spool.read_batch(self.replay_batch_size)
+        if not readings:
+            return True
+        if not (self.send_batch(readings) and self.flush()):
+            with self._outbox_cond:
+                self._stats["send_failures"] += 1
+            return False
+        self.spool.commit(position)
+        with self._outbox_cond:
+            self._stats["replayed"] += len(readings)
+        if self.logger:
+            self.logger.log_reading("network", datetime.now(), 1, f"spool_replayed_{len(readings)}")
+        return True
+
+    def _requeue(self, batch: list) -> None:
+        """Zwraca niewysłaną paczkę na początek kolejki; to, co się nie mieści, jest porzucane (najstarsze)."""
+        with self._outbox_cond:
+            for data in reversed(batch):
+                if len(self._outbox) >= self.outbox_size:
+                    self._stats["dropped_oldest"] += 1
+                    continue
+                self._outbox.appendleft(data)
+            self._outbox_cond.notify_all()
+
+    def _sender_sleep(self, seconds: float) -> None:
+        self._sender_stop.wait(timeout=seconds)
 
     def _serialize(self, data: dict) -> bytes:
         return json.dumps(data).encode('utf-8')
 
     def _deserialize(self, raw: bytes) -> dict:
         return json.loads(raw.decode('utf-8'))
+
+
+class ReadingBatch:
+    """
+    Bufor odczytów wysyłanych jedną ramką (NetworkClient.send_batch).
+    Jest gotowy do wysyłki po zebraniu max_size odczytów lub gdy najstarszy czeka max_age sekund.
+    """
+    def __init__(self, max_size=50, max_age=1.0):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._readings = []
+        self._first_added = 0.0
+
+    def add(self, reading: dict) -> None:
+        if not self._readings:
+            self._first_added = time.monotonic()
+        self._readings.append(reading)
+
+    def is_full(self) -> bool:
+        if not self._readings:
+            return False
+        return (len(self._readings) >= self.max_size or
+                time.monotonic() - self._first_added >= self.max_age)
+
+    def drain(self) -> list:
+        readings, self._readings = self._readings, []
+        return readings
+
+    def __len__(self):
+        return len(self._readings)
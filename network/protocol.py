@@ -0,0 +1,198 @@
+"""
+Binarny format ramek, włączany uzgodnieniem (handshake) na początku połączenia.
+
+Klient wysyła linię "HELLO BIN1", serwer odpowiada "OK BIN1" i od tej chwili klient
+wysyła ramki binarne (odpowiedzi serwera - ACK/NACK - pozostają liniami tekstowymi).
+Serwer, który nie zna trybu binarnego, odpowie NACK i klient zostaje przy JSON.
+
+Ramka (little-endian): nagłówek <IBI> = długość treści, typ ramki, seq (0 = bez numeru),
+a po nim treść:
+  FRAME_DEFINE  - <H> kod + napis UTF-8: wpis słownika połączenia (sensor_id / unit)
+  FRAME_READING - jeden rekord <qdHH>: znacznik czasu (µs od epoki), wartość, kod sensor_id, kod unit
+  FRAME_BATCH   - N takich rekordów, jedno ACK na całą ramkę
+  FRAME_JSON    - dowolny dokument JSON (wiadomości, których nie da się zapisać rekordami)
+
+Serwer dekoduje rekordy do RecordBlock (kolumny) i przekazuje je jako "sensor_batch".
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta
+
+HANDSHAKE_BINARY = "HELLO BIN1"
+HANDSHAKE_BINARY_OK = "OK BIN1"
+
+FRAME_HEADER = struct.Struct('<IBI')
+RECORD = struct.Struct('<qdHH')
+DEFINE_HEADER = struct.Struct('<H')
+
+FRAME_DEFINE = 1
+FRAME_READING = 2
+FRAME_BATCH = 3
+FRAME_JSON = 4
+
+MAX_FRAME_PAYLOAD = 16 * 1024 * 1024
+MAX_DICTIONARY_SIZE = 0xFFFF
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+_READING_KEYS = {"timestamp", "sensor_id", "value", "unit"}
+
+
+def datetime_to_epoch_us(dt: datetime) -> int:
+    """Czas lokalny (naiwny datetime) -> mikrosekundy od epoki, bez błędów zaokrągleń float."""
+    return int(dt.replace(microsecond=0).timestamp()) * 1_000_000 + dt.microsecond
+
+
+def epoch_us_to_datetime(epoch_us: int) -> datetime:
+    seconds, micros = divmod(epoch_us, 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros)
+
+
+class BinaryEncoder:
+    """
+    Koduje wiadomości klienta do ramek binarnych. Słownik napisów jest per połączenie:
+    nowe sensor_id/unit są wysyłane ramką FRAME_DEFINE tuż przed pierwszym użyciem.
+    """
+    def __init__(self):
+        self._codes = {}
+
+    def encode(self, data: dict, seq: int = 0) -> bytes:
+        defines = []
+        if data.get("type") == "batch":
+            frame_type = FRAME_BATCH
+            payload = self._pack_records(data.get("readings"), defines)
+        else:
+            frame_type = FRAME_READING
+            payload = self._pack_records([data], defines)
+
+        if payload is None:
+            frame_type = FRAME_JSON
+            payload = json.dumps(data).encode('utf-8')
+        # Definicje idą zawsze - nawet gdy ramka ostatecznie jest JSON, kody są już zarezerwowane.
+        return b''.join(defines) + FRAME_HEADER.pack(len(payload), frame_type, seq) + payload
+
+    def definitions(self) -> bytes:
+        """Wszystkie znane wpisy słownika - do ponownego wysłania po nowym połączeniu."""
+        return b''.join(self._define_frame(code, text) for text, code in self._codes.items())
+
+    def _code(self, text, defines):
+        code = self._codes.get(text)
+        if code is None:
+            if not isinstance(text, str) or len(self._codes) >= MAX_DICTIONARY_SIZE:
+                return None
+            code = len(self._codes)
+            self._codes[text] = code
+            defines.append(self._define_frame(code, text))
+        return code
+
+    @staticmethod
+    def _define_frame(code: int, text: str) -> bytes:
+        raw = text.encode('utf-8')
+        return FRAME_HEADER.pack(DEFINE_HEADER.size + len(raw), FRAME_DEFINE, 0) + DEFINE_HEADER.pack(code) + raw
+
+    def _pack_records(self, readings, defines):
+        """Zwraca spakowane rekordy albo None, jeśli któryś odczyt nie pasuje do formatu rekordu."""
+        if not isinstance(readings, list):
+            return None
+        packed = bytearray()
+        for reading in readings:
+            if not isinstance(reading, dict) or reading.keys() != _READING_KEYS:
+                return None
+            timestamp = reading["timestamp"]
+            try:
+                if isinstance(timestamp, str):
+                    timestamp = datetime.fromisoformat(timestamp)
+                if not isinstance(timestamp, datetime) or timestamp.tzinfo is not None:
+                    return None
+                value = float(reading["value"])
+            except (ValueError, TypeError):
+                return None
+
+            sensor_code = self._code(reading["sensor_id"], defines)
+            unit_code = self._code(reading["unit"], defines)
+            if sensor_code is None or unit_code is None:
+                return None
+            packed += RECORD.pack(datetime_to_epoch_us(timestamp), value, sensor_code, unit_code)
+        return bytes(packed)
+
+
+class RecordBlock:
+    """
+    Rekordy ramek binarnych w postaci kolumn: znaczniki czasu (µs od epoki), wartości, sensor_id, unit.
+    Dekodowanie nie buduje słownika ani napisu ISO na odczyt - odbiorcy znający RecordBlock
+    (ServerGUI, agregator serwera wieloprocesowego) czytają kolumny bezpośrednio. Iteracja zwraca
+    odczyty w kształcie JSON (timestamp jako ISO), budowane dopiero wtedy, więc pozostali odbiorcy
+    działają bez zmian.
+    """
+    __slots__ = ("timestamps_us", "values", "sensor_ids", "units")
+
+    def __init__(self, timestamps_us=None, values=None, sensor_ids=None, units=None):
+        self.timestamps_us = timestamps_us if timestamps_us is not None else []
+        self.values = values if values is not None else []
+        self.sensor_ids = sensor_ids if sensor_ids is not None else []
+        self.units = units if units is not None else []
+
+    def __len__(self):
+        return len(self.timestamps_us)
+
+    def __iter__(self):
+        for timestamp, sensor_id, value, unit in zip(self.datetimes(), self.sensor_ids, self.values, self.units):
+            yield {"timestamp": timestamp.isoformat(), "sensor_id": sensor_id, "value": value, "unit": unit}
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def extend(self, other: "RecordBlock") -> None:
+        self.timestamps_us.extend(other.timestamps_us)
+        self.values.extend(other.values)
+        self.sensor_ids.extend(other.sensor_ids)
+        self.units.extend(other.units)
+
+    def datetimes(self):
+        """Znaczniki jako naiwne datetime czasu lokalnego (jak w odczytach JSON)."""
+        last_seconds = None
+        base = None
+        for epoch_us in self.timestamps_us:
+            seconds, micros = divmod(epoch_us, 1_000_000)
+            if seconds != last_seconds:
+                # Odczyty zwykle dzielą tę samą sekundę - konwersja strefy czasowej raz na sekundę.
+                base = datetime.fromtimestamp(seconds)
+                last_seconds = seconds
+            yield base.replace(microsecond=micros)
+
+    def local_us(self) -> list:
+        """Znaczniki jako µs od 1970-01-01 czasu lokalnego (naiwnego) - bez tworzenia datetime na odczyt."""
+        ticks = []
+        last_seconds = None
+        offset_us = 0
+        for epoch_us in self.timestamps_us:
+            seconds = epoch_us // 1_000_000
+            if seconds != last_seconds:
+                offset_us = (datetime.fromtimestamp(seconds) - _NAIVE_EPOCH) // _MICROSECOND - seconds * 1_000_000
+                last_seconds = seconds
+            ticks.append(epoch_us + offset_us)
+        return ticks
+
+
+class BinaryDecoder:
+    """Dekoduje ramki binarne po stronie serwera; trzyma słownik napisów połączenia."""
+    def __init__(self):
+        self._strings = {}
+
+    def define(self, payload) -> None:
+        (code,) = DEFINE_HEADER.unpack_from(payload)
+        self._strings[code] = str(payload[DEFINE_HEADER.size:], 'utf-8')
+
+    def decode_records(self, payload) -> RecordBlock:
+        """Rekordy -> RecordBlock (kolumny); nieznany kod napisu zgłasza KeyError."""
+        strings = self._strings
+        if len(payload) == RECORD.size:  # FRAME_READING - bez zip/iter_unpack
+            epoch_us, value, sensor_code, unit_code = RECORD.unpack(payload)
+            return RecordBlock([epoch_us], [value], [strings[sensor_code]], [strings[unit_code]])
+        if not len(payload):
+            return RecordBlock()
+        timestamps, values, sensor_codes, unit_codes = zip(*RECORD.iter_unpack(payload))
+        return RecordBlock(list(timestamps), list(values),
+                           [strings[code] for code in sensor_codes], [strings[code] for code in unit_codes])
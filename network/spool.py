@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+class Spool:
+    """
+    Trwały bufor odczytów (store-and-forward) na czas niedostępności serwera.
+
+    Odczyty są dopisywane do plików segmentów (JSON, jedna linia na odczyt) w spool_dir;
+    fsync wykonywany jest zbiorczo - co fsync_every odczytów lub co fsync_interval sekund.
+    Segmenty rotują jak pliki Loggera (max_size_mb / rotate_after_lines), a segmenty starsze
+    niż retention_days są usuwane. Postęp odtwarzania jest zapisywany w checkpoint.json,
+    więc po restarcie odtwarzanie wznawia się od miejsca, w którym się zakończyło.
+    """
+    SEGMENT_PREFIX = "spool_"
+    SEGMENT_SUFFIX = ".jsonl"
+    CHECKPOINT_FILE = "checkpoint.json"
+
+    def __init__(self, spool_dir: str, max_size_mb=5, rotate_after_lines=100000, retention_days=7,
+                 fsync_every=100, fsync_interval=1.0):
+        self.spool_dir = spool_dir
+        self.max_size_mb = max_size_mb
+        self.rotate_after_lines = rotate_after_lines
+        self.retention_days = retention_days
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._checkpoint_path = os.path.join(self.spool_dir, self.CHECKPOINT_FILE)
+        self._checkpoint = self._load_checkpoint()
+
+        # Zawsze nowy segment - nie dopisujemy do pliku, który mógł zostać urwany w połowie linii.
+        existing = self._segment_indexes()
+        self._active_index = (existing[-1] + 1) if existing else 1
+        self._active_file = None
+        self._active_bytes = 0
+        self._active_lines = 0
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self._clean_old_segments()
+        self._pending = self._scan_pending()
+
+    # --- Zapis ---
+
+    def append(self, reading: dict) -> None:
+        self.append_many([reading])
+
+    def append_many(self, readings: list) -> None:
+        if not readings:
+            return
+        data = b''.join(json.dumps(r).encode('utf-8') + b'\n' for r in readings)
+        with self._lock:
+            if self._active_file is None:
+                self._open_active()
+            self._active_file.write(data)
+            self._active_bytes += len(data)
+            self._active_lines += len(readings)
+            self._unsynced += len(readings)
+            self._pending = True
+
+            if (self._unsynced >= self.fsync_every or
+                    time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._sync()
+            self._check_rotation()
+
+    def flush(self) -> None:
+        """Wymusza zapis i fsync bieżącego segmentu."""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active_file:
+                self._sync()
+                self._active_file.close()
+                self._active_file = None
+
+    # --- Odtwarzanie ---
+
+    def has_pending(self) -> bool:
+        """Czy są odczyty do odtworzenia (tania flaga - bez przeglądania plików)."""
+        return self._pending
+
+    def read_batch(self, max_count: int):
+        """
+        Czyta do max_count odczytów od punktu kontrolnego. Zwraca (odczyty, pozycja) -
+        pozycję należy przekazać do commit() dopiero po potwierdzeniu wysyłki.
+        """
+        readings = []
+        with self._lock:
+            segment, offset = self._checkpoint
+            for index in self._segment_indexes():
+                if index < segment:
+                    continue
+                if index > segment:
+                    segment, offset = index, 0
+                self._flush_if_active(index)
+                with open(self._segment_path(index), 'rb') as f:
+                    f.seek(offset)
+                    while len(readings) < max_count:
+                        line = f.readline()
+                        if not line.endswith(b'\n'):
+                            break  # koniec pliku lub urwana ostatnia linia
+                        offset += len(line)
+                        try:
+                            readings.append(json.loads(line))
+                        except ValueError:
+                            pass
+                if len(readings) >= max_count:
+                    break
+            if not readings:
+                self._pending = False
+        return readings, (segment, offset)
+
+    def commit(self, position) -> None:
+        """Zapisuje punkt kontrolny i usuwa segmenty, które zostały w całości odtworzone."""
+        with self._lock:
+            self._checkpoint = tuple(position)
+            tmp_path = self._checkpoint_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"segment": position[0], "offset": position[1]}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._checkpoint_path)
+
+            for index in self._segment_indexes():
+                if index < position[0] and index != self._active_index:
+                    self._remove_segment(index)
+
+    # --- Pomocnicze ---
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.spool_dir, f"{self.SEGMENT_PREFIX}{index:06d}{self.SEGMENT_SUFFIX}")
+
+    def _segment_indexes(self) -> list:
+        indexes = []
+        for filename in os.listdir(self.spool_dir):
+            if filename.startswith(self.SEGMENT_PREFIX) and filename.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    indexes.append(int(filename[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(indexes)
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._checkpoint_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, 0
+
+    def _scan_pending(self) -> bool:
+        segment, offset = self._checkpoint
+        for index in self._segment_indexes():
+            if index < segment:
+                continue
+            start = offset if index == segment else 0
+            if os.path.getsize(self._segment_path(index)) > start:
+                return True
+        return False
+
+    def _open_active(self) -> None:
+        self._active_file = open(self._segment_path(self._active_index), 'ab')
+        self._active_bytes = 0
+        self._active_lines = 0
+
+    def _flush_if_active(self, index: int) -> None:
+        if index == self._active_index and self._active_file:
+            self._active_file.flush()
+
+    def _sync(self) -> None:
+        if self._active_file and self._unsynced:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def _check_rotation(self) -> None:
+        perform_rotation = False
+        if self.max_size_mb and self._active_bytes >= self.max_size_mb * 1024 * 1024:
+            perform_rotation = True
+        if self.rotate_after_lines and self._active_lines >= self.rotate_after_lines:
+            perform_rotation = True
+
+        if perform_rotation:
+            self._sync()
+            self._active_file.close()
+            self._active_file = None
+            self._active_index += 1
+            self._clean_old_segments()
+
+    def _clean_old_segments(self) -> None:
+        if not self.retention_days or self.retention_days <= 0:
+            return
+        cutoff_date = datetime.now() - timedelta(days=self.retention_days)
+        for index in self._segment_indexes():
+            if index == self._active_index:
+                continue
+            try:
+                if datetime.fromtimestamp(os.path.getmtime(self._segment_path(index))) < cutoff_date:
+                    print(f"Spool: segment {index} older than {self.retention_days} days removed without replay.")
+                    self._remove_segment(index)
+            except OSError:
+                pass
+
+    def _remove_segment(self, index: int) -> None:
+        try:
+            os.remove(self._segment_path(index))
+        except OSError:
+            pass
@@ -0,0 +1,300 @@
+"""
+Agregaty odczytów (rollupy) utrzymywane przez Logger przyrostowo: dla każdego czujnika i kubełka
+czasu count / sum / min / max / sum_sq, w trzech poziomach - 1m, 1h i 1d.
+
+Pliki CSV w log_dir/rollups/<poziom>/: poziom 1m - plik na dzień, 1h - na miesiąc, 1d - na rok.
+Kubełek to początek przedziału czasu zapisany jako "YYYY-MM-DDTHH:MM" (czas naiwny, jak w logach).
+
+flush() tylko dopisuje przyrosty do dziennika partycji (<partycja>.delta.csv, klucze mogą się powtarzać).
+Dziennik jest scalany z plikiem partycji (posortowanym, klucz raz), gdy partycja się zamyka (flush trafia
+już do następnej) albo przy odczycie - koszt flush() nie zależy więc od rozmiaru partycji.
+"""
+
+import csv
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+# nazwa poziomu -> (szerokość kubełka, długość prefiksu klucza ISO, długość prefiksu nazwy partycji)
+TIERS = {
+    "1m": (timedelta(minutes=1), 16, 10),
+    "1h": (timedelta(hours=1), 13, 7),
+    "1d": (timedelta(days=1), 10, 4),
+}
+DEFAULT_RETENTION_DAYS = {"1m": 7, "1h": 90, "1d": 3650}
+ROLLUP_HEADERS = ["bucket", "sensor_id", "count", "sum", "min", "max", "sum_sq"]
+DELTA_SUFFIX = ".delta.csv"
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _bucket_key(iso_prefix: str) -> str:
+    """Prefiks znacznika ISO -> pełny klucz kubełka "YYYY-MM-DDTHH:MM"."""
+    return iso_prefix + "T00:00"[len(iso_prefix) - 10:]
+
+
+def _floor(dt: datetime, width: timedelta) -> datetime:
+    return _EPOCH + (dt - _EPOCH) // width * width
+
+
+def merge_stats(target: list, stats: list) -> None:
+    """Dołącza statystyki [count, sum, min, max, sum_sq] do target."""
+    target[0] += stats[0]
+    target[1] += stats[1]
+    if stats[2] < target[2]:
+        target[2] = stats[2]
+    if stats[3] > target[3]:
+        target[3] = stats[3]
+    target[4] += stats[4]
+
+
+class RollupStore:
+    """
+    add() zbiera przyrosty poziomu 1m w pamięci (jedna operacja na słowniku na odczyt),
+    flush() składa z nich poziomy 1h i 1d i dopisuje wszystko do plików partycji (zapis atomowy).
+    _lock chroni tylko przyrosty w pamięci - operacje na plikach (flush, read, clean_old) idą pod
+    _file_lock, więc add() nie czeka na zapis na dysk.
+    """
+    def __init__(self, rollup_dir: str, retention_days: Optional[dict] = None, flush_interval: float = 10.0):
+        self.rollup_dir = rollup_dir
+        self.retention_days = dict(DEFAULT_RETENTION_DAYS)
+        self.retention_days.update(retention_days or {})
+        self.flush_interval = flush_interval
+        self._pending = {}  # (klucz kubełka 1m, sensor_id) -> [count, sum, min, max, sum_sq]
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._open_partitions = {}  # poziom -> partycja, do której dopisywał ostatni flush()
+        for tier in TIERS:
+            os.makedirs(os.path.join(self.rollup_dir, tier), exist_ok=True)
+
+    def add(self, rows) -> None:
+        """rows: wiersze logu [timestamp ISO, sensor_id, value, unit]; wartości nieliczbowe są pomijane."""
+        with self._lock:
+            pending = self._pending
+            for row in rows:
+                try:
+                    value = float(row[2])
+                except (ValueError, TypeError):
+                    continue
+                if value != value:
+                    continue  # NaN
+                key = (row[0][:16], row[1])
+                stats = pending.get(key)
+                if stats is None:
+                    pending[key] = [1, value, value, value, value * value]
+                else:
+                    stats[0] += 1
+                    stats[1] += value
+                    if value < stats[2]:
+                        stats[2] = value
+                    if value > stats[3]:
+                        stats[3] = value
+                    stats[4] += value * value
+
+    def flush_if_due(self) -> None:
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        with self._file_lock:
+            for tier, (_, key_length, partition_length) in TIERS.items():
+                # Przyrosty poziomu pogrupowane po partycjach (plikach)
+                partitions = {}
+                for (minute_key, sensor_id), stats in pending.items():
+                    bucket = _bucket_key(minute_key[:key_length])
+                    deltas = partitions.setdefault(bucket[:partition_length], {})
+                    target = deltas.get((bucket, sensor_id))
+                    if target is None:
+                        deltas[(bucket, sensor_id)] = list(stats)
+                    else:
+                        merge_stats(target, stats)
+                for partition, deltas in sorted(partitions.items()):
+                    self._append_delta(tier, partition, deltas)
+                # Partycje starsze niż najnowsza, do której pisze flush, są zamknięte - scalenie dzienników.
+                previous = self._open_partitions.get(tier)
+                latest = max(max(partitions), previous or "")
+                closed = {partition for partition in partitions if partition < latest}
+                if previous is not None and previous < latest:
+                    closed.add(previous)
+                for partition in sorted(closed):
+                    self._compact(tier, partition)
+                self._open_partitions[tier] = latest
+
+    def _partition_path(self, tier: str, partition: str) -> str:
+        return os.path.join(self.rollup_dir, tier, partition + ".csv")
+
+    def _delta_path(self, tier: str, partition: str) -> str:
+        return os.path.join(self.rollup_dir, tier, partition + DELTA_SUFFIX)
+
+    def _append_delta(self, tier: str, partition: str, deltas: dict) -> None:
+        path = self._delta_path(tier, partition)
+        try:
+            with open(path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows([bucket, sensor_id] + stats for (bucket, sensor_id), stats in deltas.items())
+        except OSError as e:
+            print(f"BŁĄD Loggera: Nie można zapisać agregatów '{path}': {e}")
+
+    def _read_partition(self, path: str, entries: dict, header: bool = True) -> None:
+        """Dołącza wiersze pliku do entries; wiersze niepełne (np. przerwany zapis dziennika) są pomijane."""
+        try:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                if header:
+                    next(reader, None)
+                for row in reader:
+                    try:
+                        stats = [int(row[2])] + [float(v) for v in row[3:7]]
+                    except (ValueError, IndexError):
+                        continue
+                    if len(stats) < 5:
+                        continue
+                    target = entries.get((row[0], row[1]))
+                    if target is None:
+                        entries[(row[0], row[1])] = stats
+                    else:
+                        merge_stats(target, stats)
+        except OSError:
+            pass
+
+    def _compact(self, tier: str, partition: str) -> None:
+        """Scala dziennik przyrostów z plikiem partycji (zapis atomowy) i usuwa dziennik."""
+        path = self._partition_path(tier, partition)
+        delta_path = self._delta_path(tier, partition)
+        if not os.path.exists(delta_path):
+            return
+        entries = {}
+        self._read_partition(path, entries)
+        self._read_partition(delta_path, entries, header=False)
+
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(ROLLUP_HEADERS)
+                writer.writerows([bucket, sensor_id] + stats for (bucket, sensor_id), stats in sorted(entries.items()))
+            os.replace(tmp_path, path)
+            os.remove(delta_path)
+        except OSError as e:
+            print(f"BŁĄD Loggera: Nie można zapisać agregatów '{path}': {e}")
+
+    def clean_old(self) -> None:
+        """Usuwa partycje starsze niż retencja danego poziomu (według czasu modyfikacji, jak archiwa)."""
+        with self._file_lock:
+            for tier in TIERS:
+                retention = self.retention_days.get(tier)
+                if not retention or retention <= 0:
+                    continue
+                cutoff_date = datetime.now() - timedelta(days=retention)
+                tier_dir = os.path.join(self.rollup_dir, tier)
+                for filename in os.listdir(tier_dir):
+                    if not filename.endswith(".csv"):  # również dzienniki .delta.csv
+                        continue
+                    filepath = os.path.join(tier_dir, filename)
+                    try:
+                        if datetime.fromtimestamp(os.path.getmtime(filepath)) < cutoff_date:
+                            os.remove(filepath)
+                    except OSError:
+                        pass
+
+    def choose_tier(self, start_dt: datetime, end_dt: datetime, resolution: Optional[timedelta] = None) -> str:
+        """
+        Najgrubszy poziom, którego kubełki pokrywają [start_dt, end_dt) dokładnie (granice wyrównane
+        do szerokości kubełka), mieszczą się w żądanej rozdzielczości (ją dzielą) i nie wykraczają
+        poza retencję poziomu. Gdy żaden nie pasuje - najdrobniejszy poziom, którego retencja obejmuje
+        start_dt (wtedy kubełki na granicach przedziału mogą wystawać poza niego).
+        """
+        now = datetime.now()
+
+        def retained(tier):
+            retention = self.retention_days.get(tier)
+            return not retention or retention <= 0 or start_dt >= now - timedelta(days=retention)
+
+        for tier, (width, _, _) in reversed(TIERS.items()):
+            if resolution is not None and (resolution < width or resolution % width):
+                continue
+            if _floor(start_dt, width) != start_dt or _floor(end_dt, width) != end_dt:
+                continue
+            if retained(tier):
+                return tier
+        for tier in TIERS:
+            if retained(tier):
+                return tier
+        return next(iter(TIERS))
+
+    def read(self, tier: str, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str] = None) -> list:
+        """Kubełki poziomu zaczynające się w [floor(start_dt), end_dt): (początek, sensor_id, statystyki)."""
+        width, _, partition_length = TIERS[tier]
+        # Klucze "YYYY-MM-DDTHH:MM" porównywane jako napisy - liczby parsowane tylko dla wybranych wierszy.
+        first_key = _floor(start_dt, width).isoformat()[:16]
+        last_key = (end_dt - timedelta(microseconds=1)).isoformat()[:16]
+        tier_dir = os.path.join(self.rollup_dir, tier)
+        buckets = []
+        with self._file_lock:
+            partitions = sorted({f[:partition_length] for f in os.listdir(tier_dir) if f.endswith(".csv")})
+            for partition in partitions:
+                if not first_key[:partition_length] <= partition <= last_key[:partition_length]:
+                    continue
+                self._compact(tier, partition)
+                try:
+                    with open(self._partition_path(tier, partition), 'r', newline='', encoding='utf-8') as f:
+                        reader = csv.reader(f)
+                        next(reader, None)  # nagłówek
+                        for row in reader:
+                            if len(row) < 7 or not first_key <= row[0] <= last_key:
+                                continue
+                            if sensor_id is not None and row[1] != sensor_id:
+                                continue
+                            try:
+                                buckets.append((datetime.fromisoformat(row[0]), row[1],
+                                                [int(row[2])] + [float(v) for v in row[3:7]]))
+                            except ValueError:
+                                continue
+                except OSError:
+                    continue
+        return buckets
+
+    def query(self, start_dt: datetime, end_dt: datetime, sensor_id: Optional[str] = None,
+              resolution: Optional[timedelta] = None) -> list:
+        """
+        Statystyki w przedziale [start_dt, end_dt) na czujnik - w kubełkach o szerokości resolution
+        (wyrównanych do północy 1970-01-01) albo, dla resolution=None, jeden wynik na cały przedział.
+        """
+        tier = self.choose_tier(start_dt, end_dt, resolution)
+        groups = {}
+        for bucket_start, bucket_sensor, stats in self.read(tier, start_dt, end_dt, sensor_id):
+            group_start = _floor(bucket_start, resolution) if resolution else start_dt
+            target = groups.get((group_start, bucket_sensor))
+            if target is None:
+                groups[(group_start, bucket_sensor)] = list(stats)
+            else:
+                merge_stats(target, stats)
+
+        return summarize(groups, tier)
+
+
+def summarize(groups: dict, tier: Optional[str] = None) -> list:
+    """{(początek, sensor_id): [count, sum, min, max, sum_sq]} -> lista wyników z mean i std, posortowana."""
+    results = []
+    for (group_start, group_sensor), (count, total, low, high, sum_sq) in sorted(groups.items()):
+        mean = total / count
+        results.append({
+            "start": group_start,
+            "sensor_id": group_sensor,
+            "tier": tier,
+            "count": count,
+            "sum": total,
+            "min": low,
+            "max": high,
+            "sum_sq": sum_sq,
+            "mean": mean,
+            "std": math.sqrt(max(sum_sq / count - mean * mean, 0.0)),
+        })
+    return results
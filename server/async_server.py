@@ -0,0 +1,176 @@
+import asyncio
+import sys
+import threading
+import time
+
+from server.server import NetworkServer, ClientSession
+from server.framing import RecvBuffer, DEFAULT_RECV_BUFFER_SIZE
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CLIENT_IDLE_TIMEOUT = 20.0
+IDLE_SWEEP_INTERVAL = 1.0
+STOP_TIMEOUT = 5.0  # maks. czas oczekiwania stop() na zamknięcie połączeń przez pętlę zdarzeń
+
+
+class _AsyncClientProtocol(asyncio.BufferedProtocol):
+    """
+    Obsługa jednego połączenia klienta w pętli zdarzeń.
+    Pętla zapisuje dane wprost do RecvBuffer, linie są odsyłane do NetworkServer._process_message.
+    """
+    def __init__(self, server):
+        self._server = server
+        self.transport = None
+        self.client_address = None
+        self.session = None
+        self.last_activity = time.monotonic()
+        self._buffer = RecvBuffer(server.recv_buffer_size)
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.client_address = transport.get_extra_info('peername')
+        self.session = ClientSession(self.client_address)
+        self._server._connections.add(self)
+        if self._server.verbose:
+            print(f"[SERVER] Accepted connection from {self.client_address}")
+
+    def connection_lost(self, exc):
+        self._server._connections.discard(self)
+        if exc is not None:
+            print(f"[SERVER] Connection lost with {self.client_address}: {exc}", file=sys.stderr)
+        elif self._server.verbose:
+            print(f"[SERVER] Client {self.client_address} disconnected (EOF).")
+
+    def get_buffer(self, sizehint):
+        return self._buffer.get_buffer()
+
+    def buffer_updated(self, nbytes):
+        self.last_activity = time.monotonic()
+        self._buffer.buffer_updated(nbytes)
+
+        try:
+            response = self._server._process_buffer(self._buffer, self.session)
+        except ValueError as e:
+            print(f"[SERVER] Protocol error from {self.client_address}: {e}. Closing connection.", file=sys.stderr)
+            self.transport.close()
+            return
+        if response:
+            self.transport.write(response)
+
+    def pause_writing(self):
+        # Klient nie odbiera ACK - przestajemy czytać, dopóki bufor wyjściowy się nie opróżni.
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+
+class AsyncNetworkServer(NetworkServer):
+    """
+    Wariant NetworkServer oparty o asyncio: wszystkie połączenia obsługuje jedna pętla zdarzeń
+    zamiast osobnego wątku na klienta. Protokół (JSON + ACK/NACK), kontrakt data_callback
+    oraz cykl życia start()/stop() są takie same jak w NetworkServer.
+
+    data_callback jest wywoływany w wątku pętli zdarzeń, więc nie powinien blokować.
+    """
+    def __init__(self, port: int, data_callback=None, verbose: bool = True, backlog: int = 1024,
+                 recv_buffer_size: int = DEFAULT_RECV_BUFFER_SIZE, batch_callbacks: bool = False,
+                 reuse_port: bool = False):
+        super().__init__(port, data_callback=data_callback, verbose=verbose, recv_buffer_size=recv_buffer_size,
+                         batch_callbacks=batch_callbacks, reuse_port=reuse_port)
+        self.backlog = backlog
+        self._loop = None
+        self._stop_event = None
+        self._connections = set()
+        self._loop_thread = None
+        self._stopped = threading.Event()  # ustawiane, gdy start() zakończy pętlę zdarzeń
+        self._stopped.set()
+
+    def start(self) -> None:
+        self.running = True
+        self._stopped.clear()
+        self._loop_thread = threading.current_thread()
+        _raise_open_files_limit()
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            print(f"[SERVER] Unexpected error in event loop: {e}", file=sys.stderr)
+        finally:
+            self.running = False
+            self._loop = None
+            self._stop_event = None
+            self._stopped.set()
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        try:
+            server = await self._loop.create_server(
+                lambda: _AsyncClientProtocol(self),
+                host='', port=self.port, reuse_address=True, reuse_port=self.reuse_port or None,
+                backlog=self.backlog
+            )
+        except OSError as e:
+            print(f"[SERVER_SETUP] CRITICAL: Could not bind to port {self.port}. Error: {e}", file=sys.stderr)
+            self.running = False
+            if self.data_callback:
+                self.data_callback({"type": "server_error", "message": f"Could not bind to port {self.port}: {e}"})
+            return
+
+        print(f"[SERVER] Listening on port {self.port} (asyncio)")
+        sweeper = asyncio.create_task(self._close_idle_connections())
+        try:
+            if self.running:
+                await self._stop_event.wait()
+        finally:
+            sweeper.cancel()
+            server.close()
+            for connection in list(self._connections):
+                connection.transport.close()
+            await server.wait_closed()
+            print("[SERVER] Server socket closed.")
+
+    async def _close_idle_connections(self) -> None:
+        # Jeden przegląd co sekundę zamiast osobnego timera na każde połączenie.
+        while True:
+            await asyncio.sleep(IDLE_SWEEP_INTERVAL)
+            deadline = time.monotonic() - CLIENT_IDLE_TIMEOUT
+            for connection in [c for c in self._connections if c.last_activity < deadline]:
+                print(f"[SERVER] Client {connection.client_address} timed out (inactive for {CLIENT_IDLE_TIMEOUT}s). Closing connection.", file=sys.stderr)
+                connection.transport.close()
+
+    def stop(self):
+        print("[SERVER] Stop signal received. Shutting down...")
+        self.running = False
+
+        loop = self._loop
+        stop_event = self._stop_event
+        if loop and stop_event is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(stop_event.set)
+            except RuntimeError:
+                pass  # pętla zakończyła się w międzyczasie
+        # Bez _stop_event pętla jeszcze nie czeka - sprawdzi self.running po utworzeniu gniazda.
+
+        if threading.current_thread() is self._loop_thread:
+            return  # stop() z data_callback - pętla zamknie połączenia po powrocie z callbacku
+        if not self._stopped.wait(STOP_TIMEOUT):
+            print(f"[SERVER] Event loop did not finish within {STOP_TIMEOUT}s.", file=sys.stderr)
+            return
+        print("[SERVER] All client connections processed.")
+
+
+def _raise_open_files_limit() -> None:
+    """Podnosi miękki limit deskryptorów do twardego - każde połączenie to jeden deskryptor."""
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard != resource.RLIM_INFINITY and soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ValueError, OSError) as e:
+        print(f"[SERVER] Could not raise open files limit: {e}", file=sys.stderr)
@@ -0,0 +1,77 @@
+DEFAULT_RECV_BUFFER_SIZE = 64 * 1024
+
+
+class RecvBuffer:
+    """
+    Bufor odbiorczy dzielący strumień TCP na linie (lub ramki binarne) bez kopiowania danych.
+
+    Dane trafiają do jednego, zaalokowanego z góry bytearray (socket.recv_into lub
+    asyncio.BufferedProtocol), linie są zwracane jako memoryview na ten bufor,
+    a nieprzetworzona końcówka jest przesuwana na początek tylko raz - przed kolejnym odczytem.
+    Dzięki temu seria N wiadomości kosztuje O(N), a nie O(N^2) kopiowania.
+
+    Zwrócone memoryview są ważne tylko do następnego odczytu do bufora.
+    """
+    def __init__(self, size: int = DEFAULT_RECV_BUFFER_SIZE):
+        self._buf = bytearray(max(size, 1))
+        self._view = memoryview(self._buf)
+        self._start = 0  # początek nieprzetworzonych danych
+        self._end = 0    # koniec odebranych danych
+
+    def recv_from(self, sock) -> int:
+        """Odbiera dane z gniazda bezpośrednio do bufora. Zwraca liczbę bajtów (0 = EOF)."""
+        nbytes = sock.recv_into(self.get_buffer())
+        self._end += nbytes
+        return nbytes
+
+    def get_buffer(self) -> memoryview:
+        """Zwraca wolną część bufora do zapisu (np. dla asyncio.BufferedProtocol.get_buffer)."""
+        self._compact()
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        """Zaznacza, że do bufora z get_buffer() dopisano nbytes bajtów."""
+        self._end += nbytes
+
+    def lines(self):
+        """Generator kolejnych kompletnych linii (bez znaku nowej linii) jako memoryview."""
+        buf = self._buf
+        while self._start < self._end:
+            line_end = buf.find(b'\n', self._start, self._end)
+            if line_end < 0:
+                return
+            line = self._view[self._start:line_end]
+            self._start = line_end + 1
+            yield line
+
+    def frames(self, header, max_payload: int):
+        """
+        Generator kompletnych ramek z prefiksem długości: (typ, seq, treść jako memoryview).
+        header to struct.Struct z polami (długość treści, typ, seq).
+        """
+        header_size = header.size
+        while self._end - self._start >= header_size:
+            length, frame_type, seq = header.unpack_from(self._buf, self._start)
+            if length > max_payload:
+                raise ValueError(f"frame of {length} bytes exceeds limit of {max_payload} bytes")
+            frame_end = self._start + header_size + length
+            if frame_end > self._end:
+                return
+            payload = self._view[self._start + header_size:frame_end]
+            self._start = frame_end
+            yield frame_type, seq, payload
+
+    def _compact(self) -> None:
+        remaining = self._end - self._start
+        if self._start:
+            if remaining:
+                self._view[:remaining] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = remaining
+
+        if self._end == len(self._buf):
+            # Linia dłuższa niż bufor - nowy, dwa razy większy bufor (stare memoryview pozostają ważne).
+            new_buf = bytearray(len(self._buf) * 2)
+            new_buf[:remaining] = self._view[:remaining]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+
+from server.server import NetworkServer
+from server.async_server import AsyncNetworkServer
+from server.framing import DEFAULT_RECV_BUFFER_SIZE
+from network import protocol
+
+AGGREGATOR_QUEUE_SIZE = 10000  # paczek odczytów w drodze od procesów roboczych do agregatora
+AGGREGATOR_MAX_COALESCE = 256  # ile paczek z kolejki agregator łączy w jedno wywołanie data_callback
+WORKER_STOP_TIMEOUT = 5.0
+
+
+def _worker_main(worker_id: int, port: int, engine: str, recv_buffer_size: int, verbose: bool,
+                 output_queue, stop_event) -> None:
+    """Proces roboczy: własny serwer na wspólnym porcie (SO_REUSEPORT), odczyty idą do agregatora."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # zamykaniem steruje proces główny (stop_event)
+
+    def forward(message):
+        # Pełna kolejka blokuje wątek odbioru, a przez TCP - klientów (backpressure).
+        while not stop_event.is_set():
+            try:
+                output_queue.put(message, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+
+    server_class = AsyncNetworkServer if engine == "asyncio" else NetworkServer
+    server = server_class(port, data_callback=forward, verbose=verbose, recv_buffer_size=recv_buffer_size,
+                          batch_callbacks=True, reuse_port=True)
+    server_thread = threading.Thread(target=server.start, daemon=True)
+    server_thread.start()
+
+    parent = multiprocessing.parent_process()
+    while not stop_event.wait(0.5):
+        if not server_thread.is_alive():
+            print(f"[SERVER] Worker {worker_id} (pid {os.getpid()}) stopped unexpectedly.", file=sys.stderr)
+            break
+        if parent is not None and not parent.is_alive():
+            break  # proces główny zakończył się bez stop()
+
+    if server.running:
+        server.stop()
+    server_thread.join(timeout=WORKER_STOP_TIMEOUT)
+
+
+class MultiProcessNetworkServer:
+    """
+    Serwer wieloprocesowy: `workers` procesów nasłuchuje na tym samym porcie (SO_REUSEPORT),
+    jądro rozdziela między nie połączenia, więc odbiór i parsowanie nie są ograniczone jednym GIL.
+    Każdy proces roboczy sam dekoduje wiadomości i odsyła ACK, a odczyty przekazuje paczkami
+    (jedna paczka na porcję danych z gniazda) przez kolejkę multiprocessing do agregatora.
+
+    Agregatorem jest start() w procesie głównym: wywołuje data_callback tak jak NetworkServer
+    (ten sam kontrakt, również batch_callbacks), dzięki czemu ServerGUI lub inny odbiorca
+    nie musi wiedzieć, ile procesów obsługuje połączenia.
+    """
+    def __init__(self, port: int, data_callback=None, verbose: bool = True, workers: int = None,
+                 engine: str = "threaded", recv_buffer_size: int = DEFAULT_RECV_BUFFER_SIZE,
+                 batch_callbacks: bool = False):
+        self.port = port
+        self.data_callback = data_callback
+        self.verbose = verbose
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.recv_buffer_size = recv_buffer_size
+        self.batch_callbacks = batch_callbacks
+        self.running = False
+        self._processes = []
+        # spawn: procesy robocze nie dziedziczą wątków i blokad procesu głównego (np. GUI).
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._queue = None
+
+    def start(self) -> None:
+        self.running = True
+        self._stop_event.clear()
+        self._queue = self._context.Queue(maxsize=AGGREGATOR_QUEUE_SIZE)
+
+        workers = self.workers
+        if not hasattr(socket, "SO_REUSEPORT"):
+            print("[SERVER] SO_REUSEPORT is not supported on this platform. Using a single worker.", file=sys.stderr)
+            workers = 1
+
+        for worker_id in range(workers):
+            process = self._context.Process(
+                target=_worker_main, name=f"ServerWorker-{worker_id}", daemon=True,
+                args=(worker_id, self.port, self.engine, self.recv_buffer_size, self.verbose,
+                      self._queue, self._stop_event)
+            )
+            process.start()
+            self._processes.append(process)
+        print(f"[SERVER] Started {workers} worker processes ({self.engine}) on port {self.port}")
+
+        try:
+            self._aggregate()
+        except Exception as e:
+            print(f"[SERVER] Unexpected error in aggregator: {e}", file=sys.stderr)
+        finally:
+            self._stop_event.set()
+            self._join_workers()
+            self.running = False
+
+    def stop(self):
+        print("[SERVER] Stop signal received. Shutting down...")
+        self.running = False
+        self._stop_event.set()
+
+    def _aggregate(self) -> None:
+        """
+        Odbiera paczki od procesów roboczych, aż wszystkie się zakończą - również po stop(),
+        bo odczyty w kolejce zostały już potwierdzone klientom.
+        """
+        stop_deadline = None
+        while True:
+            try:
+                message = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self._processes):
+                    return
+                if not self.running:
+                    stop_deadline = stop_deadline or time.monotonic() + WORKER_STOP_TIMEOUT
+                    if time.monotonic() > stop_deadline:
+                        return
+                continue
+
+            # Łączenie paczek, które już czekają - jedno wywołanie callbacku zamiast setek.
+            readings = []
+            records = None  # odczyty z ramek binarnych łączone bez rozwijania do słowników
+            coalesced = 0
+            while True:
+                payload = message.get("payload")
+                if isinstance(payload, protocol.RecordBlock):
+                    self._deliver_readings(readings)
+                    readings = []
+                    if records is None:
+                        records = protocol.RecordBlock()
+                    records.extend(payload)
+                elif message["type"] == "sensor_batch":
+                    self._deliver_readings(records)
+                    records = None
+                    readings.extend(payload)
+                else:
+                    self._deliver_readings(readings)
+                    self._deliver_readings(records)
+                    readings, records = [], None
+                    self._invoke_callback(message)
+                coalesced += 1
+                if coalesced >= AGGREGATOR_MAX_COALESCE:
+                    break
+                try:
+                    message = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._deliver_readings(readings)
+            self._deliver_readings(records)
+
+    def _deliver_readings(self, readings) -> None:
+        if not readings:
+            return
+        if self.batch_callbacks:
+            self._invoke_callback({"type": "sensor_batch", "payload": readings})
+        else:
+            for reading in readings:
+                self._invoke_callback({"type": "sensor_data", "payload": reading})
+
+    def _invoke_callback(self, message: dict) -> None:
+        if self.data_callback:
+            try:
+                self.data_callback(message)
+            except Exception as cb_ex:
+                print(f"[SERVER] Error in data_callback: {cb_ex}", file=sys.stderr)
+
+    def _join_workers(self) -> None:
+        for process in self._processes:
+            process.join(timeout=0.1)
+            if process.is_alive():
+                print(f"[SERVER] Worker {process.name} unresponsive after stop timeout. Terminating.", file=sys.stderr)
+                process.terminate()
+                process.join(timeout=1.0)
+        self._processes = []
+        print("[SERVER] All worker processes stopped.")
@@ -1,24 +1,107 @@
 import socket
 import threading
 import json
+import re
 import sys
 import os
 
+# Przy uruchomieniu jako skrypt (python server/server.py) katalog projektu musi być w sys.path.
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _project_root not in sys.path:
+    sys.path.insert(0, _project_root)
+
+from server.framing import RecvBuffer, DEFAULT_RECV_BUFFER_SIZE
+from network import protocol
+
+_SEQ_PATTERN = re.compile(rb'"seq"\s*:\s*(\d+)')  # seq z wiadomości, której nie da się zdekodować
+
+
+class ClientSession:
+    """
+    Stan protokołu jednego połączenia klienta, wspólny dla wszystkich trybów serwera.
+
+    Wiadomości z polem "seq" są potwierdzane zbiorczo: po przetworzeniu porcji danych
+    serwer odsyła jedno "ACK <seq>" oznaczające, że dotarły wszystkie wiadomości do <seq> włącznie.
+    """
+    def __init__(self, client_address):
+        self.client_address = client_address
+        self.last_seq = None
+        self._ack_pending = False
+        self.binary = False
+        self.decoder = None
+        self.pending_readings = []  # dla batch_callbacks: odczyty zebrane z jednej porcji danych
+        self.pending_records = None  # ...a z ramek binarnych - jeden RecordBlock
+
+    def start_binary(self) -> None:
+        """Przełącza połączenie na ramki binarne (po linii HELLO BIN1)."""
+        self.binary = True
+        self.decoder = protocol.BinaryDecoder()
+
+    def accept_seq(self, seq: int) -> bool:
+        """
+        Rejestruje numer sekwencyjny. Zwraca True, jeśli wiadomość jest kolejną w strumieniu
+        i należy ją przetworzyć; duplikaty i wiadomości po luce są pomijane (Go-Back-N),
+        a klient dostaje ponownie ostatnie potwierdzenie.
+        """
+        self._ack_pending = True
+        if self.last_seq is None or seq == self.last_seq + 1:
+            self.last_seq = seq
+            return True
+        return False
+
+    def reject_seq(self, seq=None):
+        """
+        Wiadomość odrzucona (NACK) też zajmuje swój numer sekwencyjny - inaczej okno klienta stanęłoby
+        na niej. Bez znanego seq przyjmowany jest kolejny oczekiwany numer. Zwraca numer, którego
+        dotyczy NACK, albo None poza trybem potokowym.
+        """
+        if seq is None:
+            if self.last_seq is None:
+                return None
+            seq = self.last_seq + 1
+        self.accept_seq(seq)
+        return seq
+
+    def take_ack(self) -> bytes:
+        """Zwraca zbiorcze potwierdzenie, jeśli od ostatniego wywołania przyszły wiadomości z "seq"."""
+        if not self._ack_pending or self.last_seq is None:
+            return b''
+        self._ack_pending = False
+        return f"ACK {self.last_seq}\n".encode('ascii')
+
 
 # --- Początek definicji klasy NetworkServer ---
 class NetworkServer:
-    def __init__(self, port: int, data_callback=None):
+    def __init__(self, port: int, data_callback=None, verbose: bool = True,
+                 recv_buffer_size: int = DEFAULT_RECV_BUFFER_SIZE, batch_callbacks: bool = False,
+                 reuse_port: bool = False):
+        """
+        batch_callbacks=True: zamiast wywołania data_callback na każdą wiadomość, wszystkie odczyty
+        odebrane jedną porcją danych (jeden recv) trafiają do data_callback jako jedno
+        {"type": "sensor_batch", "payload": [...]}. Komunikaty o błędach są przekazywane od razu.
+        Odczyty z ramek binarnych przychodzą jako "sensor_batch" z payload typu protocol.RecordBlock
+        (kolumny; iteracja daje słowniki jak w JSON).
+
+        reuse_port=True ustawia SO_REUSEPORT - kilka procesów może nasłuchiwać na tym samym porcie,
+        a jądro rozdziela między nie połączenia (zob. server/multiproc.py).
+        """
         self.port = port
         self.running = False
         self._server_socket = None
         self._client_threads = []
         self.data_callback = data_callback
+        self.verbose = verbose
+        self.recv_buffer_size = recv_buffer_size
+        self.batch_callbacks = batch_callbacks
+        self.reuse_port = reuse_port
 
     def start(self) -> None:
         self.running = True
         try:
             self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.reuse_port:
+                self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self._server_socket.bind(('', self.port))
             self._server_socket.listen()
             print(f"[SERVER] Listening on port {self.port}")
@@ -85,60 +168,30 @@ class NetworkServer:
         print(f"[SERVER] Client {client_address} connected on thread {threading.current_thread().name}")
         client_socket.settimeout(20.0)
 
+        session = ClientSession(client_address)
         with client_socket:
-            remaining_buffer = b''
+            recv_buffer = RecvBuffer(self.recv_buffer_size)
             while self.running:
                 try:
-                    # 1. Odbierz dane od klienta
-                    chunk = client_socket.recv(1024)
-                    if not chunk:
+                    # 1. Odbierz dane od klienta bezpośrednio do bufora
+                    if not recv_buffer.recv_from(client_socket):
                         print(f"[SERVER] Client {client_address} disconnected (EOF).")
                         break
 
-                    current_data = remaining_buffer + chunk
-
-                    while b'\n' in current_data and self.running:
-                        line_end = current_data.find(b'\n')
-                        complete_message = current_data[:line_end]
-                        current_data = current_data[line_end + 1:]
+                    # 2. Przetwórz wszystkie kompletne wiadomości
+                    response = self._process_buffer(recv_buffer, session)
 
-                        if not complete_message.strip():
-                            continue
-
-                        # 2. Przetwórz wiadomość
+                    # 3. Odeślij ACK/NACK
+                    if response:
                         try:
-                            msg_str = complete_message.decode('utf-8')
-                            decoded_data = json.loads(msg_str)
-                            print(f"[SERVER] Received from {client_address}: {decoded_data}")
-
-                            if self.data_callback:
-                                try:
-                                    self.data_callback({"type": "sensor_data", "payload": decoded_data})
-                                except Exception as cb_ex:
-                                    print(f"[SERVER] Error in data_callback: {cb_ex}", file=sys.stderr)
-
-                            client_socket.sendall(b"ACK\n")
-
-                        except json.JSONDecodeError as e_json:
-                            print(f"[SERVER] JSON Decode Error from {client_address}: {e_json}. Msg: '{msg_str[:100]}...'", file=sys.stderr)
-                            client_socket.sendall(b"NACK_JSON_ERROR\n")
-                            if self.data_callback:
-                                self.data_callback({"type": "decode_error", "message": f"JSON Decode Error from {client_address}. Msg: '{msg_str[:100]}...'"})
+                            client_socket.sendall(response)
                         except socket.error as se_ack:
+                            # Błąd dotyczy tylko tego klienta - serwer obsługuje pozostałe dalej.
                             print(f"[SERVER] Socket error sending ACK/NACK to {client_address}: {se_ack}", file=sys.stderr)
-                            self.running = False
                             break
-                        except Exception as e_proc:
-                            print(f"[SERVER] Error processing message/responding to {client_address}: {e_proc}", file=sys.stderr)
-                            try:
-                                client_socket.sendall(b"NACK_SERVER_ERROR\n")
-                            except socket.error:
-                                self.running = False;
-                                break
 
                     if not self.running:
                         break
-                    remaining_buffer = current_data
 
                 except socket.timeout:
                     print( f"[SERVER] Client {client_address} timed out (inactive for {client_socket.gettimeout()}s). Closing connection.", file=sys.stderr)
@@ -156,13 +209,163 @@ class NetworkServer:
 
             print(f"[SERVER] Finished handling client {client_address}. Thread {threading.current_thread().name} exiting.")
 
+    def _process_buffer(self, recv_buffer: RecvBuffer, session: ClientSession) -> bytes:
+        """
+        Przetwarza wszystkie kompletne wiadomości z bufora (linie JSON albo, po uzgodnieniu,
+        ramki binarne) i zwraca odpowiedzi do odesłania jednym zapisem.
+        """
+        responses = []
+        while self.running:
+            if session.binary:
+                for frame_type, seq, payload in recv_buffer.frames(protocol.FRAME_HEADER, protocol.MAX_FRAME_PAYLOAD):
+                    responses.append(self._process_frame(frame_type, seq, payload, session))
+                    if not self.running:
+                        break
+                break
+
+            for complete_message in recv_buffer.lines():
+                responses.append(self._process_message(complete_message, session))
+                if session.binary or not self.running:
+                    break  # reszta bufora to już ramki binarne
+            if not session.binary:
+                break
+
+        self._flush_pending(session)
+
+        # Wiadomości z "seq" potwierdzane jednym zbiorczym ACK
+        responses.append(session.take_ack())
+        return b''.join(responses)
+
+    def _process_message(self, complete_message, session: ClientSession) -> bytes:
+        """
+        Dekoduje jedną wiadomość JSON (bytes lub memoryview z RecvBuffer), przekazuje ją
+        do data_callback i zwraca odpowiedź (ACK/NACK); puste linie są pomijane.
+        Dla wiadomości z polem "seq" zwraca b'' - potwierdzenie wysyła się później przez session.take_ack().
+        Wspólne dla wszystkich trybów serwera.
+        """
+        client_address = session.client_address
+        msg_str = ''
+        seq = None
+        try:
+            msg_str = str(complete_message, 'utf-8')
+            if not msg_str.strip():
+                return b''
+            if msg_str.strip() == protocol.HANDSHAKE_BINARY:
+                session.start_binary()
+                if self.verbose:
+                    print(f"[SERVER] Client {client_address} switched to binary protocol.")
+                return f"{protocol.HANDSHAKE_BINARY_OK}\n".encode('ascii')
+
+            decoded_data = json.loads(msg_str)
+            raw_seq = decoded_data.pop("seq", None) if isinstance(decoded_data, dict) else None
+            seq = int(raw_seq) if raw_seq is not None else None
+            message = self._build_message(decoded_data)
+            return self._dispatch(message, seq, session)
+
+        except json.JSONDecodeError as e_json:
+            print(f"[SERVER] JSON Decode Error from {client_address}: {e_json}. Msg: '{msg_str[:100]}...'", file=sys.stderr)
+            if self.data_callback:
+                self.data_callback({"type": "decode_error", "message": f"JSON Decode Error from {client_address}. Msg: '{msg_str[:100]}...'"})
+            match = _SEQ_PATTERN.search(bytes(complete_message))
+            return self._nack(b"NACK_JSON_ERROR", session, int(match.group(1)) if match else None)
+        except Exception as e_proc:
+            print(f"[SERVER] Error processing message from {client_address}: {e_proc}", file=sys.stderr)
+            return self._nack(b"NACK_SERVER_ERROR", session, seq)
+
+    def _process_frame(self, frame_type: int, seq: int, payload, session: ClientSession) -> bytes:
+        """Odpowiednik _process_message dla ramek binarnych (network/protocol.py)."""
+        try:
+            if frame_type == protocol.FRAME_DEFINE:
+                session.decoder.define(payload)
+                return b''
+            if frame_type == protocol.FRAME_READING:
+                records = session.decoder.decode_records(payload)
+                if len(records) != 1:
+                    raise ValueError(f"reading frame with {len(records)} records")
+                message = {"type": "sensor_batch", "payload": records}
+            elif frame_type == protocol.FRAME_BATCH:
+                message = {"type": "sensor_batch", "payload": session.decoder.decode_records(payload)}
+            elif frame_type == protocol.FRAME_JSON:
+                message = self._build_message(json.loads(str(payload, 'utf-8')))
+            else:
+                raise ValueError(f"unknown frame type {frame_type}")
+        except Exception as e_frame:
+            print(f"[SERVER] Binary frame error from {session.client_address}: {e_frame}", file=sys.stderr)
+            if self.data_callback:
+                self.data_callback({"type": "decode_error", "message": f"Binary frame error from {session.client_address}: {e_frame}"})
+            if frame_type == protocol.FRAME_DEFINE:
+                # Definicje nie mają numeru sekwencyjnego - klient nie zalicza tego NACK do okna.
+                return b"NACK_BINARY_ERROR\n"
+            return self._nack(b"NACK_BINARY_ERROR", session, seq or None)
+
+        return self._dispatch(message, seq or None, session)
+
+    @staticmethod
+    def _nack(reason: bytes, session: ClientSession, seq=None) -> bytes:
+        """
+        NACK dla odrzuconej wiadomości. W trybie potokowym zawiera jej seq ("NACK_... <seq>"),
+        a numer jest zaliczany jak przy ACK, więc klient nie ponawia wiadomości i okno idzie dalej.
+        """
+        seq = session.reject_seq(seq)
+        return reason + (f" {seq}\n".encode('ascii') if seq is not None else b"\n")
+
+    @staticmethod
+    def _build_message(decoded_data) -> dict:
+        # Ramka wsadowa: {"type": "batch", "readings": [...]} - jedno wywołanie callbacku i jedno ACK
+        if isinstance(decoded_data, dict) and decoded_data.get("type") == "batch":
+            readings = decoded_data.get("readings")
+            if not isinstance(readings, list):
+                raise ValueError("batch frame without 'readings' list")
+            return {"type": "sensor_batch", "payload": readings}
+        return {"type": "sensor_data", "payload": decoded_data}
+
+    def _dispatch(self, message: dict, seq, session: ClientSession) -> bytes:
+        """Przekazuje zdekodowaną wiadomość do data_callback i zwraca ACK (lub b'' dla wiadomości z seq)."""
+        if seq is not None and not session.accept_seq(seq):
+            return b''
+
+        if self.verbose:
+            print(f"[SERVER] Received from {session.client_address}: {message['payload']}")
+
+        if self.batch_callbacks:
+            payload = message["payload"]
+            if isinstance(payload, protocol.RecordBlock):
+                if session.pending_readings:
+                    self._flush_pending(session)  # zachowanie kolejności odczytów
+                if session.pending_records is None:
+                    session.pending_records = protocol.RecordBlock()
+                session.pending_records.extend(payload)
+            else:
+                if session.pending_records is not None:
+                    self._flush_pending(session)
+                if message["type"] == "sensor_batch":
+                    session.pending_readings.extend(payload)
+                else:
+                    session.pending_readings.append(payload)
+        else:
+            self._invoke_callback(message)
+
+        return b"ACK\n" if seq is None else b''
+
+    def _flush_pending(self, session: ClientSession) -> None:
+        """batch_callbacks: przekazuje zebrane odczyty jednym wywołaniem data_callback."""
+        if session.pending_readings:
+            readings, session.pending_readings = session.pending_readings, []
+            self._invoke_callback({"type": "sensor_batch", "payload": readings})
+        if session.pending_records is not None:
+            records, session.pending_records = session.pending_records, None
+            self._invoke_callback({"type": "sensor_batch", "payload": records})
+
+    def _invoke_callback(self, message: dict) -> None:
+        if self.data_callback:
+            try:
+                self.data_callback(message)
+            except Exception as cb_ex:
+                print(f"[SERVER] Error in data_callback: {cb_ex}", file=sys.stderr)
 
 
 if __name__ == "__main__":
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-    if project_root not in sys.path:
-        sys.path.insert(0, project_root)
+    project_root = _project_root
 
     try:
         from network.config import load_config
@@ -172,6 +375,9 @@ if __name__ == "__main__":
 
     config_file_path = os.path.join(project_root, "config.yaml")
     server_port = 9999  # Domyślny port
+    server_mode = "threaded"
+    recv_buffer_size = DEFAULT_RECV_BUFFER_SIZE
+    workers = None
 
     if not os.path.exists(config_file_path):
         print(f"[SERVER_SETUP] WARNING: Config '{config_file_path}' not found. Using default port {server_port}.",
@@ -181,6 +387,9 @@ if __name__ == "__main__":
             config_data = load_config(config_file_path)
             if config_data and "network" in config_data and "port" in config_data["network"]:
                 server_port = int(config_data["network"]["port"])  # Upewnij się, że port jest int
+                server_mode = config_data["network"].get("server_mode", server_mode)
+                recv_buffer_size = int(config_data["network"].get("recv_buffer_size", recv_buffer_size))
+                workers = config_data["network"].get("workers", workers)
             else:
                 print(
                     f"[SERVER_SETUP] WARNING: 'network' key or 'port' not in '{config_file_path}' or empty. Using default port {server_port}.",
@@ -190,11 +399,19 @@ if __name__ == "__main__":
                 f"[SERVER_SETUP] WARNING: Error loading config '{config_file_path}': {e}. Using default port {server_port}.",
                 file=sys.stderr)
 
-    server = NetworkServer(port=server_port)
+    if server_mode == "multiprocess":
+        from server.multiproc import MultiProcessNetworkServer
+        server = MultiProcessNetworkServer(port=server_port, workers=workers, recv_buffer_size=recv_buffer_size,
+                                           verbose=False)
+    elif server_mode == "asyncio":
+        from server.async_server import AsyncNetworkServer
+        server = AsyncNetworkServer(port=server_port, recv_buffer_size=recv_buffer_size)
+    else:
+        server = NetworkServer(port=server_port, recv_buffer_size=recv_buffer_size)
     server_thread = None
 
     try:
-        print(f"[SERVER_SETUP] Starting server on port {server_port}...")
+        print(f"[SERVER_SETUP] Starting {server_mode} server on port {server_port}...")
         # Uruchomienie serwera w osobnym wątku, aby główny wątek mógł obsłużyć KeyboardInterrupt
         server_thread = threading.Thread(target=server.start, daemon=True)
         server_thread.start()